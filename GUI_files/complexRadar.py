@@ -58,10 +58,16 @@ class ComplexRadar():
         self.ax = axes[0]
     def plot(self, data, *args, **kw):
         sdata = _scale_data(data, self.ranges)
-        self.ax.plot(self.angle, np.r_[sdata, sdata[0]], *args, **kw)
+        return self.ax.plot(self.angle, np.r_[sdata, sdata[0]], *args, **kw)
     def fill(self, data, *args, **kw):
         sdata = _scale_data(data, self.ranges)
-        self.ax.fill(self.angle, np.r_[sdata, sdata[0]], *args, **kw)
+        return self.ax.fill(self.angle, np.r_[sdata, sdata[0]], *args, **kw)
+    def set_data(self, line, polygon, data):
+        """moves the artists returned by plot and fill to new data"""
+        sdata = _scale_data(data, self.ranges)
+        closed = np.r_[sdata, sdata[0]]
+        line.set_data(self.angle, closed)
+        polygon.set_xy(np.column_stack([self.angle, closed]))
 
 # # example data
 # variables = ("Normal Scale", "Inverted Scale", "Inverted 2", 
@@ -0,0 +1,145 @@
+'''Prebuilt model artifacts for the apps.
+
+The pygame solver plays today's word with the cluster model trained by wordle_cluster_2k.run_simulation_pygame.
+The trained model is saved as a checkpoint bundle, a directory holding everything needed to play it again:
+
+    q_table.npy         - the Q-table (clusters x clusters)
+    cluster_labels.npy  - cluster of every word of the corpus (int16), the labels the Q-table was learnt with
+    words.npy           - the words of the corpus the labels are for (S5)
+    metadata.json       - format version, corpus kind, hash of its word list, number of clusters, hyper-parameters,
+                          number of training games played, drift of the labels and number of words of their last full
+                          clustering (see incremental.py) and time of the save
+
+The arrays are loaded memory-mapped and read-only, so loading is zero-copy and processes forked after the first load
+share the pages (policies that keep learning copy the Q-table). A bundle is written to a temporary directory that then
+replaces the old one, so a training run checkpointing periodically never leaves a half-written bundle behind. The
+build cache of incremental.py is made of the same bundles.
+
+The pygame model lives in models/pygame_model/. If the goal words changed, the words that are still there keep their
+labels and the new ones join the nearest cluster, so the Q-table still lines up. If it is missing, of an older
+format or the goal words drifted too far, it is rebuilt on first use from a fresh clustering and the Q-table in
+models/Q_table.npy.'''
+
+import os
+import glob
+import json
+import time
+import uuid
+import shutil
+import numpy as np
+from functools import lru_cache
+from models import engine, vocabulary
+
+CHECKPOINT_VERSION = 2
+PYGAME_MODEL_PATH = 'models/pygame_model'
+Q_TABLE_PATH = 'models/Q_table.npy'
+
+# Hyper-parameters and number of games models/Q_table.npy was trained with by run_simulation_pygame
+PYGAME_HYPERPARAMETERS = {'learning_rate': 0.001, 'exploration_rate': 0.9, 'shrinkage_factor': 0.9}
+PYGAME_TRAINING_GAMES = 100000
+
+# Write the arrays (one .npy each) and the metadata of a bundle, replacing any bundle at path. Concurrent writers
+# each use their own temporary directory, the first one to finish wins
+def write_bundle(path:str, arrays:dict, metadata:dict):
+    tmp_path, old_path = f'{path}.{uuid.uuid4().hex}.tmp', f'{path}.{uuid.uuid4().hex}.old'
+    os.makedirs(tmp_path)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), values)
+    with open(os.path.join(tmp_path, 'metadata.json'), 'w') as file:
+        json.dump(metadata, file, indent=2)
+    if os.path.exists(path):
+        os.rename(path, old_path)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        if not os.path.exists(path):
+            raise
+        shutil.rmtree(tmp_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+# Arrays of a bundle (memory-mapped, read-only) and its metadata
+def read_bundle(path:str, names:tuple):
+    # A write interrupted between its two renames leaves the previous bundle as .old
+    if not os.path.exists(path) and glob.glob(f'{path}.*.old'):
+        path = glob.glob(f'{path}.*.old')[0]
+    with open(os.path.join(path, 'metadata.json')) as file:
+        metadata = json.load(file)
+    return {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in names}, metadata
+
+# Save a Q-table with the cluster labels it was learnt with as a checkpoint bundle, replacing any bundle at path
+def save_checkpoint(path:str, q_table:np.ndarray, cluster_assignment:np.ndarray, hyperparameters:dict, games:int,
+                    corpus_kind:str='goal', drift:float=0.0, clustered_words:int=None):
+    cluster_assignment = np.asarray(cluster_assignment)
+    words = engine.get_corpus(corpus_kind).words
+    if len(cluster_assignment) != len(words):
+        raise ValueError(f'{len(cluster_assignment)} cluster labels for the {len(words)} words of the {corpus_kind} '
+                         f'corpus')
+    metadata = {'version': CHECKPOINT_VERSION,
+                'corpus_kind': corpus_kind,
+                'words_hash': vocabulary.get_words_hash(corpus_kind),
+                'number_of_cluster': int(cluster_assignment.max()) + 1,
+                'hyperparameters': {name: float(value) for name, value in hyperparameters.items()},
+                'games': int(games),
+                'drift': float(drift),
+                'clustered_words': int(clustered_words or len(words)),
+                'created': time.time()}
+    write_bundle(path, {'q_table': np.asarray(q_table, dtype=np.float64),
+                        'cluster_labels': cluster_assignment.astype(np.int16),
+                        'words': np.array(words, dtype='S5')}, metadata)
+
+# Q-table, cluster labels (both memory-mapped, read-only) and metadata of a checkpoint bundle. With check_words
+# False a bundle trained on another word list loads too, metadata['words'] then has the words of its labels
+def load_checkpoint(path:str, corpus_kind:str='goal', check_words:bool=True):
+    arrays, metadata = read_bundle(path, ('q_table', 'cluster_labels', 'words'))
+    if metadata['version'] != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is a version {metadata['version']} checkpoint, expected {CHECKPOINT_VERSION}")
+    if metadata['corpus_kind'] != corpus_kind:
+        raise ValueError(f"{path} was trained on the {metadata['corpus_kind']} corpus, not {corpus_kind}")
+    if check_words and metadata['words_hash'] != vocabulary.get_words_hash(corpus_kind):
+        raise ValueError(f'{path} was trained on another word list, train or build it again')
+    metadata['words'] = [word.decode('ascii') for word in arrays['words']]
+    return arrays['q_table'], arrays['cluster_labels'], metadata
+
+# Cluster the goal words and save the labels with the trained Q-table as the pygame model
+def build_pygame_model(number_of_cluster:int=9, q_table_path:str=Q_TABLE_PATH, output_path:str=PYGAME_MODEL_PATH):
+    from models import incremental
+    cluster_results = incremental.cluster_words('goal', number_of_cluster)
+    q_table = np.load(q_table_path)
+    if q_table.shape != (number_of_cluster, number_of_cluster):
+        raise ValueError(f'{q_table_path} has shape {q_table.shape}, expected a Q-table for {number_of_cluster} clusters')
+    save_checkpoint(output_path, q_table, cluster_results, PYGAME_HYPERPARAMETERS, PYGAME_TRAINING_GAMES)
+
+# Bring the labels of the pygame model up to date with the goal words without touching its Q-table, False if the
+# words drifted too far for that
+def update_pygame_model(path:str=PYGAME_MODEL_PATH):
+    from models import incremental
+    q_table, cluster_results, metadata = load_checkpoint(path, check_words=False)
+    clustered_words = metadata.get('clustered_words', len(metadata['words']))
+    cluster_results, drift = incremental.update_cluster_labels(metadata['words'], cluster_results, 'goal',
+                                                               metadata['drift'], clustered_words=clustered_words)
+    if cluster_results is None:
+        return False
+    save_checkpoint(path, q_table, cluster_results, metadata['hyperparameters'], metadata['games'], drift=drift,
+                    clustered_words=clustered_words)
+    return True
+
+# Load the cluster labels and Q-table for the pygame solver, updating or rebuilding the bundle if it is stale
+@lru_cache(maxsize=None)
+def load_pygame_model(number_of_cluster:int=9):
+    try:
+        q_table, cluster_results, metadata = load_checkpoint(PYGAME_MODEL_PATH, check_words=False)
+        if q_table.shape == (number_of_cluster, number_of_cluster):
+            if metadata['words_hash'] == vocabulary.get_words_hash('goal'):
+                return cluster_results, q_table
+            if update_pygame_model():
+                q_table, cluster_results, _ = load_checkpoint(PYGAME_MODEL_PATH)
+                return cluster_results, q_table
+    except (OSError, ValueError, KeyError):
+        pass
+    build_pygame_model(number_of_cluster)
+    q_table, cluster_results, _ = load_checkpoint(PYGAME_MODEL_PATH)
+    return cluster_results, q_table
+
+if __name__ == '__main__':
+    build_pygame_model()
+    print(f'Saved the cluster labels and Q-table to {PYGAME_MODEL_PATH}/')
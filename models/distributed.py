@@ -0,0 +1,269 @@
+'''Distributed simulations over ZeroMQ.
+
+A coordinator splits a simulation job (model, hyper-parameters, range of seeds, games per seed) into shards of a few
+seeds and hands them to workers over ZeroMQ, on this machine or others. Each seed is one run of the model
+(evaluation.iter_model with that seed), so the results don't depend on which worker played it:
+
+    python -m models.distributed coordinator --model cluster_2k --seeds 0:32 --games 1000 --bind tcp://*:5557
+    python -m models.distributed worker --connect tcp://coordinator-host:5557
+
+    python -m models.distributed coordinator --model greedy_search_2k --seeds 0:8 --games 500 --local 4
+
+--local starts that many workers on localhost itself. The coordinator is a ROUTER socket and the workers DEALER
+sockets, every message is [kind, JSON header, binary frames...]:
+
+    worker -> coordinator   ready                                   a new worker, idle
+                            heartbeat                               sent every HEARTBEAT_INTERVAL seconds, even busy
+                            result {shard, seed} steps time target  games of one seed, int16 / float32 / S5 arrays
+                            done {shard}                            shard finished, the worker is idle again
+                            error {shard, error}                    playing the shard failed, the worker is idle again
+    coordinator -> worker   job {shard, model, parameters, seeds, games}
+                            register                                to a dropped worker heard from again
+                            stop
+
+A worker not heard from for HEARTBEAT_TIMEOUT seconds is dropped and its shard goes back to the queue. Results of a
+shard are only kept once its done arrives from the worker it was given to, so a re-dispatched shard is never
+counted twice. A worker is only given a shard after ready or done, never on a heartbeat: a dropped worker that
+heart-beats again (e.g. after a long step holding the GIL) may still be playing its old shard, so it is asked to
+register and answers ready once it is idle. Jobs a busy worker is sent anyway are queued, not dropped. A shard that
+fails on a worker (e.g. a missing dependency on that host) goes back to the queue for the other workers, a shard that
+failed on MAX_ATTEMPTS workers or on every worker there is (e.g. an unknown model) fails the run. The results can be
+written to the result store, one run per seed.'''
+
+import os
+import json
+import time
+import queue
+import socket
+import threading
+import argparse
+import numpy as np
+from collections import deque
+from multiprocessing import Process
+from models.result_cache import EVALUATION_RUNS, MODELS
+
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_TIMEOUT = 5.0
+MAX_ATTEMPTS = 3
+DEFAULT_ADDRESS = 'tcp://127.0.0.1:5557'
+
+def send(sock, kind:str, header:dict=None, frames:list=(), identity:bytes=None):
+    message = [kind.encode('ascii'), json.dumps(header or {}).encode('utf-8')] + list(frames)
+    sock.send_multipart([identity] + message if identity is not None else message)
+
+def parse(message:list):
+    return message[0].decode('ascii'), json.loads(message[1]), message[2:]
+
+# Plays the seeds of a job and queues the games of every seed as a result message, then done (error if it failed)
+def play_job(job:dict, messages:queue.Queue):
+    try:
+        from models.evaluation import iter_model
+        for seed in range(*job['seeds']):
+            steps, times, targets = [], [], []
+            for record in iter_model(job['model'], *job['parameters'], num_simulations=job['games'], seed=seed):
+                steps.append(record['steps'])
+                times.append(record['time'])
+                targets.append(record['target'])
+            messages.put(('result', {'shard': job['shard'], 'seed': seed},
+                          [np.array(steps, dtype=np.int16).tobytes(), np.array(times, dtype=np.float32).tobytes(),
+                           np.array(targets, dtype='S5').tobytes()]))
+    except Exception as error:
+        messages.put(('error', {'shard': job['shard'], 'error': f'{type(error).__name__}: {error}'}, []))
+        return
+    messages.put(('done', {'shard': job['shard']}, []))
+
+''' Worker: plays the shards it is given and streams the games of every seed back. The games run in a thread, so the
+heartbeats keep going while a policy builds its tables or a long game runs; the socket stays with the main thread. '''
+
+def run_worker(address:str=DEFAULT_ADDRESS, name:str=None):
+    import zmq
+
+    context = zmq.Context.instance()
+    sock = context.socket(zmq.DEALER)
+    sock.setsockopt(zmq.IDENTITY, (name or f'{socket.gethostname()}-{os.getpid()}').encode('utf-8'))
+    sock.setsockopt(zmq.LINGER, 1000)
+    sock.connect(address)
+    send(sock, 'ready')
+    last_sent = time.time()
+    messages = queue.Queue()
+    jobs = deque()
+    job = None
+
+    try:
+        while True:
+            if sock.poll(100):
+                kind, header, _ = parse(sock.recv_multipart())
+                if kind == 'stop':
+                    break
+                if kind == 'job':
+                    jobs.append(header)
+                elif kind == 'register' and job is None and not jobs:
+                    send(sock, 'ready')
+                    last_sent = time.time()
+            while not messages.empty():
+                kind, header, frames = messages.get()
+                send(sock, kind, header, frames)
+                last_sent = time.time()
+                if kind in ('done', 'error'):
+                    job = None
+            if job is None and jobs:
+                job = threading.Thread(target=play_job, args=(jobs.popleft(), messages), daemon=True)
+                job.start()
+            if time.time() - last_sent > HEARTBEAT_INTERVAL:
+                send(sock, 'heartbeat')
+                last_sent = time.time()
+    finally:
+        sock.close()
+
+''' Coordinator: shards the seeds, hands the shards to idle workers, re-dispatches the shards of workers that stop
+heart-beating and collects the games. Returns {seed: {'steps', 'time', 'target'}} and the run statistics. '''
+
+def run_coordinator(model:str, parameters:tuple, seeds:range, games:int, address:str=DEFAULT_ADDRESS,
+                    seeds_per_shard:int=1, store=None, progress=None, timeout:float=None):
+    import zmq
+
+    context = zmq.Context.instance()
+    sock = context.socket(zmq.ROUTER)
+    sock.setsockopt(zmq.LINGER, 1000)
+    sock.bind(address)
+
+    shards = {shard: (start, min(start + seeds_per_shard, seeds.stop))
+              for shard, start in enumerate(range(seeds.start, seeds.stop, seeds_per_shard))}
+    pending = deque(shards)
+    assigned = {}   # shard -> worker
+    buffers = {}    # shard -> {seed: games}, until the shard is done
+    last_seen = {}  # worker -> time of its last message
+    idle = deque()
+    failures = {}   # shard -> {worker: error} of the workers it failed on
+    results = {}
+    redispatched = 0
+
+    toc = time.time()
+    try:
+        while len(results) < len(seeds):
+            if timeout is not None and time.time() - toc > timeout:
+                raise TimeoutError(f'{len(results)} of {len(seeds)} seeds done after {timeout}s')
+            if sock.poll(100):
+                identity, *message = sock.recv_multipart()
+                kind, header, frames = parse(message)
+                if identity not in last_seen and kind == 'heartbeat':
+                    send(sock, 'register', identity=identity)
+                if kind == 'ready' and identity not in idle and identity not in assigned.values():
+                    idle.append(identity)
+                last_seen[identity] = time.time()
+
+                if kind == 'result' and assigned.get(header['shard']) == identity:
+                    buffers[header['shard']][header['seed']] = {
+                        'steps': np.frombuffer(frames[0], dtype=np.int16),
+                        'time': np.frombuffer(frames[1], dtype=np.float32),
+                        'target': np.frombuffer(frames[2], dtype='S5')}
+                elif kind == 'done':
+                    shard = header['shard']
+                    if assigned.get(shard) == identity:
+                        del assigned[shard]
+                        results.update(buffers.pop(shard))
+                        if progress is not None:
+                            progress(len(results), len(seeds))
+                    if identity not in idle:
+                        idle.append(identity)
+                elif kind == 'error':
+                    shard = header['shard']
+                    if assigned.get(shard) == identity:
+                        del assigned[shard]
+                        buffers.pop(shard, None)
+                        failures.setdefault(shard, {})[identity] = header['error']
+                        pending.append(shard)
+                        redispatched += 1
+                    if identity not in idle:
+                        idle.append(identity)
+
+            # Workers gone quiet lose their shard
+            now = time.time()
+            for worker in [worker for worker, seen in last_seen.items() if now - seen > HEARTBEAT_TIMEOUT]:
+                del last_seen[worker]
+                if worker in idle:
+                    idle.remove(worker)
+                for shard in [shard for shard, owner in assigned.items() if owner == worker]:
+                    del assigned[shard]
+                    buffers.pop(shard, None)
+                    pending.appendleft(shard)
+                    redispatched += 1
+
+            # A shard that can't be played anywhere fails the run
+            for shard in pending:
+                failed_on = failures.get(shard, {})
+                if failed_on and (len(failed_on) >= MAX_ATTEMPTS or last_seen and set(last_seen) <= set(failed_on)):
+                    raise RuntimeError(f'Shard {shard} (seeds {shards[shard]}) failed on {len(failed_on)} workers: '
+                                       + '; '.join(f"{worker.decode('utf-8')}: {error}"
+                                                   for worker, error in failed_on.items()))
+
+            # Idle workers get the first pending shard that didn't fail on them
+            for worker in list(idle):
+                shard = next((shard for shard in pending if worker not in failures.get(shard, {})), None)
+                if shard is None:
+                    continue
+                idle.remove(worker)
+                pending.remove(shard)
+                assigned[shard] = worker
+                buffers[shard] = {}
+                send(sock, 'job', {'shard': shard, 'model': model, 'parameters': list(parameters),
+                                   'seeds': shards[shard], 'games': games}, identity=worker)
+    finally:
+        for worker in last_seen:
+            send(sock, 'stop', identity=worker)
+        sock.close()
+    tic = time.time()
+
+    if store is not None:
+        for seed in sorted(results):
+            with store.writer(model, *parameters, seed=seed) as writer:
+                for epoch, (steps, game_time, target) in enumerate(zip(results[seed]['steps'], results[seed]['time'],
+                                                                       results[seed]['target'])):
+                    writer.append({'epoch': epoch, 'target': target.decode('ascii'), 'steps': int(steps),
+                                   'time': float(game_time), 'visited_words': []})
+    return results, {'time_taken': tic - toc, 'workers': len(last_seen), 'redispatched': redispatched}
+
+def parse_seeds(seeds:str):
+    start, stop = (int(value) for value in seeds.split(':'))
+    return range(start, stop)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run simulations on workers over ZeroMQ.')
+    subparsers = parser.add_subparsers(dest='role', required=True)
+    coordinator = subparsers.add_parser('coordinator', help='shard a job over the workers and collect the games')
+    coordinator.add_argument('--model', choices=MODELS, default='cluster_2k')
+    coordinator.add_argument('--seeds', type=parse_seeds, default=range(0, 8), help='seed range, start:stop')
+    coordinator.add_argument('--games', type=int, default=1000, help='games per seed')
+    coordinator.add_argument('--seeds-per-shard', type=int, default=1)
+    coordinator.add_argument('--bind', default=DEFAULT_ADDRESS)
+    coordinator.add_argument('--local', type=int, default=0, help='number of workers to start on localhost')
+    coordinator.add_argument('--store', action='store_true', help='write the games to the result store')
+    worker = subparsers.add_parser('worker', help='play the shards of a coordinator')
+    worker.add_argument('--connect', default=DEFAULT_ADDRESS)
+    args = parser.parse_args()
+
+    if args.role == 'worker':
+        run_worker(args.connect)
+    else:
+        # The parameters analysis.ipynb evaluated the model with
+        _, learning_rate, exploration_rate, shrinkage_factor, num_clusters, _ = next(
+            run for run in EVALUATION_RUNS if run[0] == args.model)
+        connect = args.bind.replace('*', '127.0.0.1')
+        workers = [Process(target=run_worker, args=(connect,), daemon=True) for _ in range(args.local)]
+        for process in workers:
+            process.start()
+        store = None
+        if args.store:
+            from models.result_store import ResultStore
+            store = ResultStore()
+
+        results, stats = run_coordinator(args.model, (learning_rate, exploration_rate, shrinkage_factor, num_clusters),
+                                         args.seeds, args.games, args.bind, args.seeds_per_shard, store,
+                                         progress=lambda done, total: print(f'{done}/{total} seeds done'))
+        for process in workers:
+            process.join(timeout=5)
+
+        steps = np.concatenate([results[seed]['steps'] for seed in sorted(results)])
+        print(f"{args.model}: {len(steps)} games from {stats['workers']} workers in {stats['time_taken']:.1f}s "
+              f"({stats['redispatched']} shards re-dispatched)")
+        print(f'Average guesses: {steps.mean():.3f}, win rate {np.mean(steps <= 6) * 100:.2f}%')
@@ -0,0 +1,928 @@
+'''Shared solver engine for every model.
+
+The Wordle environment, the evaluation/filter rules, the clustering and the greedy search helpers used to be copied
+into each model module (and the pygame app). They now live here once, together with the precomputed tables they
+need, and every model is a Policy played through the same game loop:
+
+    QBasePolicy     - Q-learning over word-word pairs, fresh Q-table every game (wordle_base_15k)
+    QClusterPolicy  - Q-learning over cluster-cluster pairs, Q-table kept across games (wordle_cluster_*)
+    GreedyPolicy    - greedy search on letter occurrence or letter position scores (wordle_greedy_search_*)
+    EntropyPolicy   - picks the candidate whose feedback splits the remaining candidates the most
+
+Word lists (Corpus), cluster assignments, greedy word scores and feedback tables are built on first use and cached,
+so every policy in a process shares them.'''
+
+import re
+import time
+import heapq
+import random
+import string
+import numpy as np
+from functools import lru_cache
+from models import vocabulary
+# tqdm, leven and scipy are imported inside the functions that use them to keep importing the engine fast
+
+''' Corpus, the word list a policy guesses from (or draws goal words from), as the arrays the solvers filter on.
+The 'accepted' corpus is the 12974 accepted words (sorted), the 'goal' corpus the 2309 goal words in daily order.
+Positions in the corpus are what the policies work with, corpus.words maps them back to the words themselves.'''
+
+class Corpus():
+    def __init__(self, kind:str):
+        self.kind = kind
+        self.ids = vocabulary.get_word_ids(kind)
+        self.words = vocabulary.get_words(kind)
+        self.index = {word: position for position, word in enumerate(self.words)}
+        rows = vocabulary.load_vocabulary()[self.ids]
+        self.letters = vocabulary.get_letters(rows)
+        self.letter_masks = np.asarray(rows['letter_mask'])
+
+    def __len__(self):
+        return len(self.words)
+
+@lru_cache(maxsize=None)
+def get_corpus(kind:str='accepted'):
+    return Corpus(kind)
+
+''' Custom Clustering class that does the clustering based on the levenshtein distance measure, agglomerative
+(exact, quadratic) or k-medoids (approximate, linear). See wordle_cluster_15k.py for the reasoning behind it.'''
+
+class Clustering():
+    def __init__(self, number_of_clusters:int, method:str='agglomerative',
+                 sample_size:int=500, number_of_samples:int=5, max_iterations:int=100, rng=random):
+        if method not in ('agglomerative', 'kmedoids'):
+            raise ValueError(f"Unknown clustering method '{method}', expected 'agglomerative' or 'kmedoids'")
+        self.number_of_clusters = number_of_clusters
+        self.method = method
+        # Only used by the approximate k-medoids backend
+        self.sample_size = sample_size
+        self.number_of_samples = number_of_samples
+        self.max_iterations = max_iterations
+        # Random stream of the k-medoids samples (and get_chosen_word), a seeded random.Random makes them reproducible
+        self.rng = rng
+
+    # Calculate the distance matrix based on the levenshtein distance measure. Only the upper triangle is kept,
+    # flattened row by row (condensed form), and as uint8 since two 5-letter words are at most 5 edits apart
+    def get_dist_matrix(self, corpus:list):
+        from leven import levenshtein
+        n = len(corpus)
+        distance_matrix = np.zeros(n*(n-1)//2, dtype=np.uint8)
+        start = 0
+        for i in range(n - 1):
+            end = start + n - i - 1
+            distance_matrix[start:end] = [levenshtein(corpus[i], word) for word in corpus[i+1:]]
+            start = end
+        return distance_matrix
+
+    # Get the indexes of the words with the chosen cluster number
+    def get_indexes_of_cluster(self, cluster_number:int, clusters:list):
+        indexes = []
+        for index, number in enumerate(clusters):
+            if cluster_number == number:
+                indexes.append(index)
+        return indexes
+
+    # Pick a random word from the chosen cluster
+    def get_chosen_word(self, indexes:list, corpus:list):
+        chosen_word_index = self.rng.choice(indexes)
+        return corpus[chosen_word_index]
+
+    # Get all the leaves (words) under a node of the merge tree
+    def get_descendants(self, node:int, children:np.ndarray, n_leaves:int):
+        descendants = []
+        to_visit = [node]
+        while to_visit:
+            node = to_visit.pop()
+            if node < n_leaves:
+                descendants.append(node)
+            else:
+                to_visit.extend(children[node - n_leaves])
+        return descendants
+
+    # Cut the merge tree into the chosen number of clusters, numbering the clusters
+    # the same way sklearn's AgglomerativeClustering does so the saved Q-table still lines up
+    def cut_tree(self, children:np.ndarray, n_leaves:int):
+        nodes = [-(max(children[-1]) + 1)]
+        for _ in range(self.number_of_clusters - 1):
+            these_children = children[-nodes[0] - n_leaves]
+            heapq.heappush(nodes, -these_children[0])
+            heapq.heappushpop(nodes, -these_children[1])
+        clusters = np.zeros(n_leaves, dtype=np.intp)
+        for cluster_number, node in enumerate(nodes):
+            clusters[self.get_descendants(-node, children, n_leaves)] = cluster_number
+        return clusters
+
+    # Get the distances from every word in the corpus to each of the given words
+    def get_distances_to(self, corpus:list, targets:list):
+        from leven import levenshtein
+        distances = np.zeros((len(corpus), len(targets)), dtype=np.uint8)
+        for j, target in enumerate(targets):
+            distances[:, j] = [levenshtein(word, target) for word in corpus]
+        return distances
+
+    # k-medoids on a small square distance matrix: greedy BUILD initialisation, then swap each
+    # medoid for the member of its cluster with the lowest total distance until nothing changes
+    def get_medoids(self, distances:np.ndarray):
+        distances = distances.astype(np.int32)
+        medoids = [int(np.argmin(distances.sum(axis=1)))]
+        nearest = distances[:, medoids[0]]
+        for _ in range(self.number_of_clusters - 1):
+            gains = np.maximum(nearest[:, None] - distances, 0).sum(axis=0)
+            gains[medoids] = -1
+            medoids.append(int(np.argmax(gains)))
+            nearest = np.minimum(nearest, distances[:, medoids[-1]])
+
+        for _ in range(self.max_iterations):
+            clusters = np.argmin(distances[:, medoids], axis=1)
+            new_medoids = []
+            for cluster_number, medoid in enumerate(medoids):
+                members = np.flatnonzero(clusters == cluster_number)
+                costs = distances[np.ix_(members, members)].sum(axis=1)
+                new_medoids.append(int(members[np.argmin(costs)]) if len(members) > 0 else medoid)
+            if new_medoids == medoids:
+                break
+            medoids = new_medoids
+        return medoids
+
+    # Approximate clustering for large vocabularies (CLARA): run k-medoids on a few random samples of the corpus,
+    # keep the medoids with the lowest total distance over the whole corpus and give every word its nearest medoid.
+    # Only O(n*k) distances are ever computed, so time and memory stay linear in the corpus size
+    def get_clusters_kmedoids(self, corpus:list):
+        n = len(corpus)
+        sample_size = min(n, max(self.sample_size, 40 + 2*self.number_of_clusters))
+        best_cost, best_clusters = None, None
+        for _ in range(self.number_of_samples):
+            sample = self.rng.sample(range(n), sample_size)
+            sample_words = [corpus[i] for i in sample]
+            medoids = self.get_medoids(self.get_distances_to(sample_words, sample_words))
+            distances = self.get_distances_to(corpus, [sample_words[i] for i in medoids])
+            clusters = np.argmin(distances, axis=1)
+            cost = int(distances.min(axis=1).sum(dtype=np.int64))
+            if best_cost is None or cost < best_cost:
+                best_cost, best_clusters = cost, clusters
+        return best_clusters
+
+    # Get the clusters based on the levenshtein distance measure
+    def get_clusters(self, corpus:list, distance_matrix:np.ndarray=None):
+        if self.method == 'kmedoids':
+            return self.get_clusters_kmedoids(corpus)
+        from scipy.cluster.hierarchy import linkage
+        if distance_matrix is None:
+            distance_matrix = self.get_dist_matrix(corpus)
+        # Average linkage straight on the condensed matrix, the same merge tree that
+        # AgglomerativeClustering(affinity='precomputed', linkage='average') builds from the full n x n matrix
+        children = linkage(distance_matrix, method='average')[:, :2].astype(int)
+        clusters = self.cut_tree(children, len(corpus))
+        return clusters
+
+# The agglomerative clustering of a corpus is deterministic, so it is only computed once per number of clusters
+# and shared by every run in the process (e.g. across a grid search). It is kept in the build cache across runs and
+# only updated for the words added or removed when the word lists change (see incremental.py)
+@lru_cache(maxsize=None)
+def get_cluster_assignment(corpus_kind:str, number_of_cluster:int):
+    from models import incremental
+    return np.asarray(incremental.get_cluster_assignment(corpus_kind, number_of_cluster))
+
+''' Custom Wordle class that defines the state of the wordle and the actions (and reward) that can be taken
+also includes getter methods for the state and the goal word. The state is whatever the policy plays on,
+the word itself for wordle_base and the cluster number for the cluster models. '''
+
+class Wordle():
+    def __init__(self, initial_word='CRANE', goal_word=None, goal_words=None, rng=random):
+        self.current_word = initial_word
+        self.current_state = initial_word
+        if goal_word is None:
+            goal_word = rng.choice(goal_words if goal_words is not None else get_corpus('goal').words)
+        self.goal_word = goal_word
+        self.reached_goal = False
+
+    def get_state(self):
+        return self.current_state
+
+    def get_curr_word(self):
+        return self.current_word
+
+    def get_goal(self):
+        return self.goal_word
+
+    # Action is picking the next word (and the state it leads to, the word itself unless given)
+    def make_action(self, action, state=None):
+        # scoring based on yellow, green & black letters
+        current_score = eval.get_score(self.current_word, self.goal_word)
+
+        # select next word and get a new scoring
+        self.current_word = action
+        self.current_state = action if state is None else state
+        new_score = eval.get_score(self.current_word, self.goal_word)
+
+        # calculate reward of previous word to new word
+        reward = eval.get_reward(current_score, new_score)
+
+        # if ever the case the goal state is reached, True is returned
+        if self.current_word == self.goal_word:
+            return reward, True
+        return reward, False
+
+''' Custom Evaluation class that contains the getter methods for the scoring and reward of the wordle.
+The scoring is based on the number of yellow, green and black letters in the wordle.
+The reward is based on the number of yellow (+/-5), green (+/-10) and black letters (-/+1) in the wordle.
+Reward 10 for each additional green letter, +5 for each additional yellow letter, penalty of -1 for each additional black letter.
+Includes filter function to help reduce the search space of the wordle in terms of the feasible words remaining.
+The pattern is the per-letter version of the scoring ('g', 'y' or 'b' for each position), filter_candidates
+applies the same rules as filter on an array of corpus positions using the precomputed letter arrays. '''
+
+class eval():
+    def __init__(self):
+        pass
+
+    def get_pattern(word_1:str, word_2:str):
+        pattern = ''
+        for i in range(5):
+            if word_1[i] == word_2[i]:
+                pattern += 'g'
+            elif word_1[i] in word_2:
+                pattern += 'y'
+            else:
+                pattern += 'b'
+        return pattern
+
+    def get_score(word_1:str , word_2:str):
+        scoring = {'green': 0, 'yellow': 0, 'black': 0}
+        for i in range(5):
+            if word_1[i] == word_2[i]:
+                scoring['green'] += 1
+            elif word_1[i] in word_2:
+                scoring['yellow'] += 1
+            else:
+                scoring['black'] += 1
+        return scoring
+
+    def get_reward(new_scoring:dict, previous_score:dict):
+        reward = 0
+        reward += (new_scoring['green'] - previous_score['green'])*10
+        reward += (new_scoring['yellow'] - previous_score['yellow'])*5
+        reward -= (new_scoring['black'] - previous_score['black'])*1
+        return reward
+
+    def get_letters(filter_word:str, pattern:str):
+        black_letters = []  # list of black letters
+        yellow_letters = {}  # key-val pair of yellow letters and their positions
+        green_letters = {}  # key-val pair of green letters and their positions
+        for i in range(5):
+            if pattern[i] == 'b':
+                black_letters.append(filter_word[i])
+            elif pattern[i] == 'g':
+                green_letters[filter_word[i]] = i
+            else:
+                yellow_letters[filter_word[i]] = i
+        return black_letters, yellow_letters, green_letters
+
+    def filter(filter_word:str, goal_word:str, corpus:list, keep_filter_word:bool=True):
+        # Get the list or dict of black letters, yellow letters and green letters
+        black_letters, yellow_letters, green_letters = eval.get_letters(
+            filter_word, eval.get_pattern(filter_word, goal_word))
+
+        # Remove any words with the black letters
+        if len(black_letters) != 0:
+            strings_to_remove = "[{}]".format("".join(black_letters))
+            corpus = [word for word in corpus if (
+                re.sub(strings_to_remove, '', word) == word or word == filter_word)]
+
+        # Keep only words with correct green position
+        if len(green_letters) != 0:
+            for key, value in green_letters.items():
+                corpus = [word for word in corpus if (
+                    word[value] == key or word == filter_word)]
+
+        # Do not keep words with yellow letters in current position
+        if len(yellow_letters) != 0:
+            for key, value in yellow_letters.items():
+                corpus = [word for word in corpus if (
+                    word[value] != key or word == filter_word)]
+
+        # Do not keep words without yellow letters in other positions
+        if len(yellow_letters) != 0:
+            for yellow_letter in yellow_letters.keys():
+                corpus = [word for word in corpus if (
+                    yellow_letter in word or word == filter_word)]
+
+        # The cluster models remove the word we filtering on, since their state-action pair is cluster-cluster
+        if not keep_filter_word and filter_word in corpus:
+            corpus.remove(filter_word)
+
+        # Return filtered corpus
+        return corpus
+
+    # filter_position is -1 for a filter word from outside the corpus, given as filter_word
+    def filter_candidates(corpus:Corpus, candidates:np.ndarray, filter_position:int, pattern:str,
+                          keep_filter_word:bool=True, filter_word:str=None):
+        filter_word = corpus.words[filter_position] if filter_position >= 0 else filter_word
+        black_letters, yellow_letters, green_letters = eval.get_letters(filter_word, pattern)
+        letters = corpus.letters[candidates]
+        letter_masks = corpus.letter_masks[candidates]
+        keep = np.ones(len(candidates), dtype=bool)
+
+        if len(black_letters) != 0:
+            black_mask = sum(1 << (ord(letter) - ord('A')) for letter in set(black_letters))
+            keep &= (letter_masks & black_mask) == 0
+        for key, value in green_letters.items():
+            keep &= letters[:, value] == ord(key) - ord('A')
+        for key, value in yellow_letters.items():
+            keep &= letters[:, value] != ord(key) - ord('A')
+            keep &= (letter_masks & (1 << (ord(key) - ord('A')))) != 0
+
+        is_filter_word = candidates == filter_position
+        keep = (keep | is_filter_word) if keep_filter_word else (keep & ~is_filter_word)
+        return candidates[keep]
+
+''' Greedy search helpers (references in wordle_greedy_search_15k.py). Words are scored on how common their letters
+are in the word list, the best scoring word that is still possible is guessed next. '''
+
+#Edited function from interface.py
+def evalGuess(guess, target):
+    res = ["w" for i in range(5)]
+    checkedTarget = [False for i in range(5)]
+    checked = [False for i in range(5)]
+    #Check for right letter and position
+    for i in range(5):
+        if (guess[i] == target[i]):
+            res[i] = "g"
+            checked[i] = True
+            checkedTarget[i] = True
+
+    #Checked for right letter but wrong position
+    for i in range(5):
+        if (not(checked[i])):
+            for j in range(5):
+                if (guess[i] == target[j] and not(checkedTarget[j])):
+                    res[i] = "y"
+                    checkedTarget[j] = True
+                    break
+    return res
+
+#Gets number of occurence of letter in word from wordlist
+def calcAlphabetScorebyOccurence(wordlist):
+    alphabetVal = {}
+    for word in wordlist:
+        for letter in set(word):
+            alphabetVal[letter] = alphabetVal.get(letter, 0) + 1
+    alphabetVal = sorted(alphabetVal.items(), key=lambda x: x[1], reverse=True)
+    return dict(alphabetVal)
+
+#Calculate score of each words from given wordlist and alphabet score
+def calcWordScorebyOccurence(wordlist):
+    alphabetVal= calcAlphabetScorebyOccurence(wordlist)
+    wordScore = {}
+    for word in wordlist:
+        for letter in set(word):
+            wordScore[word] = wordScore.get(word, 0) + alphabetVal.get(letter, 0)
+    wordScore = sorted(wordScore.items(), key=lambda x: x[1], reverse=True)
+    return dict(wordScore)
+
+#Gets matrix of letters an occurence in position
+def calcAlphabetScorebyPosition(wordlist):
+    alphabetVal = {}
+    for alphabet in string.ascii_uppercase:
+        alphabetVal[alphabet] = [0 for _ in range (5)]
+    for word in wordlist:
+        for i in range(len(word)):
+            alphabetVal[word[i]][i] += 1
+    return alphabetVal
+
+#Gets dictionary of word and its score using position occurence
+def calcWordScorebyPosition(wordlist):
+    alphabetScore = calcAlphabetScorebyPosition(wordlist)
+    wordScore = {}
+    for word in wordlist:
+        for i in range(5):
+            wordScore[word] = wordScore.get(word, 0) + alphabetScore[word[i]][i]
+    wordScore = sorted(wordScore.items(), key=lambda x: x[1], reverse=True)
+    return dict(wordScore)
+
+#Word scores only depend on the word list, so they are computed once and copied for every game
+@lru_cache(maxsize=None)
+def get_word_scores(corpus_kind:str, scoring:str='occurrence'):
+    wordlist = get_corpus(corpus_kind).words
+    if scoring == 'occurrence':
+        return calcWordScorebyOccurence(wordlist)
+    if scoring == 'position':
+        return calcWordScorebyPosition(wordlist)
+    raise ValueError(f"Unknown scoring '{scoring}', expected 'occurrence' or 'position'")
+
+#Corpus positions of the words from best to worst score, shared read-only by every game of the greedy policy
+@lru_cache(maxsize=None)
+def get_score_order(corpus_kind:str, scoring:str='occurrence'):
+    corpus = get_corpus(corpus_kind)
+    order = np.array([corpus.index[word] for word in get_word_scores(corpus_kind, scoring)], dtype=np.int32)
+    order.flags.writeable = False
+    return order
+
+#Get words from wordlist
+def getGoalWords():
+    return list(get_corpus('goal').words)
+
+def getGuessWords():
+    return list(get_corpus('accepted').words)
+
+def getRandomTarget(keys):
+    return random.choice(keys)
+
+def buildTree(wordlist):
+    tree = {}
+    for word in wordlist:
+        tree[word] = {}
+        for referWord in wordlist:
+            if(word != referWord):
+                eval = str(evalGuess(word, referWord))
+                tree[word].setdefault(eval, [])
+                tree[word][eval].append(referWord)
+    return tree
+
+#Decrease words from wordscores given information green (correct place)
+def solveGreen(wordscores, guessWord, toEvaluate, guessResult):
+    wordscores.pop(guessWord,None)
+    key_list= list(wordscores)
+    indices = []
+    for i in range(5):
+        if(guessResult[i] == "g"):
+            toEvaluate[i] = guessWord[i]
+            indices.append(i)
+    for wordsLeft in key_list:
+        for i in indices:
+            if (wordsLeft[i] not in toEvaluate[i]):
+                wordscores.pop(wordsLeft,None)
+                break
+    return wordscores, toEvaluate
+
+def solveYellow(wordscores, guessWord, toEvaluate, guessResult):
+    wordscores.pop(guessWord,None)
+    key_list= list(wordscores)
+    indices = []
+    for i in range(5):
+        if(guessResult[i] == "y"):
+            toEvaluate[i]= toEvaluate[i].replace(guessWord[i], '')
+            indices.append(i)
+    for wordsLeft in key_list:
+        for i in indices:
+            if (guessWord[i] not in wordsLeft or wordsLeft[i] not in toEvaluate[i]):
+                wordscores.pop(wordsLeft,None)
+                break
+    return wordscores, toEvaluate
+
+def solveGray(wordscores, guessWord, toEvaluate, guessResult):
+    wordscores.pop(guessWord,None)
+    key_list= list(wordscores)
+    indices = []
+    for i in range(5):
+        if(guessResult[i] == "w"):
+            indices.append(i)
+
+    for i in indices:
+        toEvaluate[i] = toEvaluate[i].replace(guessWord[i], '')
+
+    for wordsLeft in key_list:
+        for i in indices:
+            if(wordsLeft[i] not in toEvaluate[i]):
+                wordscores.pop(wordsLeft,None)
+                break
+    return wordscores, toEvaluate
+
+def solveWithAll(wordscores,guessWord, toEvaluate, guessResult):
+    wordscores,toEvaluate = solveGreen(wordscores,guessWord, toEvaluate, guessResult)
+    wordscores,toEvaluate = solveYellow(wordscores,guessWord, toEvaluate, guessResult)
+    wordscores,toEvaluate = solveGray(wordscores,guessWord, toEvaluate, guessResult)
+    return wordscores, toEvaluate
+
+def solveTree(wordscores,guessWord,tree, guessResult):
+    filter = tree[guessWord][str(guessResult)]
+    for word in list(wordscores):
+        if word not in filter:
+            wordscores.pop(word,None)
+    return wordscores
+
+#Edited function from interface.py
+def printGuess(guess, target):
+    res = evalGuess(guess, target)
+    #Print Top box lines
+    top = ""
+    for color in res:
+        top += f" |{color}| "
+    print(top)
+
+    #Print middle box lines with letter
+    mid = ""
+    for i in range(5):
+        mid += f" |{guess[i]}| "
+    print(mid)
+    print()
+
+    return res
+
+def checkGuess(evaluations):
+    for eval in evaluations:
+        if (eval != "g"):
+            return False
+    return True
+
+''' Feedback tables, the evalGuess result of every guess against every target encoded as one uint8 per pair
+(each position is 0 for grey, 1 for yellow and 2 for green, position i weighted by 3**i). Built with numpy in
+chunks of guesses and cached per (guess corpus, target corpus) pair, in the process and in the build cache. '''
+
+def encode_feedback(evaluation):
+    code = 0
+    for i, colour in enumerate(evaluation):
+        code += {'w': 0, 'y': 1, 'g': 2}[colour] * 3**i
+    return code
+
+def decode_feedback(code:int):
+    evaluation = []
+    for _ in range(5):
+        evaluation.append('wyg'[code % 3])
+        code //= 3
+    return evaluation
+
+def get_feedback_codes(guess_letters:np.ndarray, target_letters:np.ndarray):
+    green = guess_letters[:, None, :] == target_letters[None, :, :]
+    yellow = np.zeros_like(green)
+    for i in range(5):
+        letter = guess_letters[:, i][:, None]
+        # Letters of the target not already matched by a green, minus the ones earlier yellows used up
+        available = np.zeros(green.shape[:2], dtype=np.int8)
+        for j in range(5):
+            available += (target_letters[None, :, j] == letter) & ~green[:, :, j]
+        for k in range(i):
+            available -= (guess_letters[:, k] == guess_letters[:, i])[:, None] & yellow[:, :, k]
+        yellow[:, :, i] = ~green[:, :, i] & (available > 0)
+    return ((2*green + yellow) * 3**np.arange(5)).sum(axis=2).astype(np.uint8)
+
+def compute_feedback_table(guess_letters:np.ndarray, target_letters:np.ndarray, chunk_size:int=256):
+    table = np.zeros((len(guess_letters), len(target_letters)), dtype=np.uint8)
+    for start in range(0, len(guess_letters), chunk_size):
+        table[start:start+chunk_size] = get_feedback_codes(guess_letters[start:start+chunk_size], target_letters)
+    return table
+
+# Read-only, loaded from the build cache (and only updated for the words added or removed, see incremental.py)
+@lru_cache(maxsize=None)
+def get_feedback_table(guess_kind:str='goal', target_kind:str='goal', chunk_size:int=256):
+    from models import incremental
+    return np.asarray(incremental.get_feedback_table(guess_kind, target_kind, chunk_size))
+
+''' Policies. A policy is created once per run and shared across its games, anything that only lives for one game
+goes on the Game object new_game returns. play drives a single game:
+
+    new_game(wordle)                   -> Game, also sets the initial state on the wordle
+    get_feedback(guess, goal)          -> what the policy learns from a guess, in the form observe expects
+    observe(game, guess, feedback)     -> narrows game.candidates down
+    choose(game, state, steps)         -> (action, word) the next guess and the state it leads to
+    learn(game, state, action, reward) -> update from the reward of that guess (Q-learning policies only)
+
+Live games, where the goal is unknown (session.SolverSession), use get_feedback_from_colors(guess, evaluation) in
+place of get_feedback to turn the colors of the game (evalGuess format) into observe's feedback, and
+get_state(word) for the state a guess leads to. '''
+
+class Game():
+    def __init__(self, candidates:np.ndarray, epsilon:float=0):
+        self.candidates = candidates
+        self.epsilon = epsilon
+
+class Policy():
+    name = 'policy'
+    corpus_kind = 'accepted'
+    goal_kind = 'goal'
+
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random
+
+    @property
+    def corpus(self):
+        return get_corpus(self.corpus_kind)
+
+    def get_goal_words(self):
+        return get_corpus(self.goal_kind).words
+
+    def new_game(self, wordle:Wordle):
+        return Game(np.arange(len(self.corpus)))
+
+    def get_feedback(self, guess:str, goal:str):
+        return eval.get_pattern(guess, goal)
+
+    def observe(self, game:Game, guess:str, feedback):
+        game.candidates = eval.filter_candidates(self.corpus, game.candidates, self.corpus.index.get(guess, -1),
+                                                 feedback, filter_word=guess)
+
+    # get_pattern marks a letter yellow wherever the goal has it, so a grey letter that is green or yellow
+    # elsewhere in the guess (a repeated letter) is a 'y' in the pattern
+    def get_feedback_from_colors(self, guess:str, evaluation:list):
+        found = {guess[i] for i in range(5) if evaluation[i] != 'w'}
+        return ''.join('g' if colour == 'g' else 'y' if colour == 'y' or guess[i] in found else 'b'
+                       for i, colour in enumerate(evaluation))
+
+    def get_state(self, word:str):
+        return None
+
+    def choose(self, game:Game, state, steps:int):
+        raise NotImplementedError
+
+    def learn(self, game:Game, state, action, reward:float):
+        pass
+
+    # Number of words still possible in the game
+    def remaining(self, game:Game):
+        return len(game.candidates)
+
+''' Q-learning over word-word pairs. The Q-table is reinitialised every game and only ever holds the pairs the
+game visits, so it is kept sparse (a dict of rows) instead of a dense n x n array shrunk with np.delete. '''
+
+class QBasePolicy(Policy):
+    name = 'RL Base'
+
+    def __init__(self, learning_rate:float, exploration_rate:float, shrinkage_factor:float,
+                 corpus_kind:str='accepted', goal_kind:str='goal', rng=None):
+        super().__init__(rng)
+        self.alpha = learning_rate  # learning rate
+        self.epsilon = exploration_rate  # probability of exploration
+        self.gamma = shrinkage_factor  # discounting factor
+        self.corpus_kind = corpus_kind
+        self.goal_kind = goal_kind
+
+    def new_game(self, wordle:Wordle):
+        game = Game(np.arange(len(self.corpus)), self.epsilon)
+        game.q_table = {}
+        game.guessed = set()
+        wordle.current_state = self.corpus.index[wordle.get_curr_word()]
+        return game
+
+    def get_state(self, word:str):
+        return self.corpus.index.get(word)
+
+    def choose(self, game:Game, state:int, steps:int):
+        candidates = game.candidates
+        q_row = game.q_table.get(state, {})
+        # The words guessed so far stay candidates (the filter keeps them) but were not the goal
+        game.guessed.add(state)
+        game.epsilon = game.epsilon / (steps ** 2) # Decaying epsilon, explore lesser as it goes on
+        if self.rng.uniform(0, 1) < game.epsilon: # Explore
+            action = int(self.rng.choice(candidates))
+        else: # Exploit
+            # Q-table is very sparse in beginning, hence if the row of Q-table all similar still (0), do exploration still
+            unguessed = np.array([i for i in candidates if i not in game.guessed])
+            q_values = np.array([q_row.get(i, 0) for i in unguessed])
+            if len(unguessed) == 0 or np.all(q_values == q_values[0]):
+                action = int(self.rng.choice(candidates))
+            else: # Exploit
+                action = int(unguessed[np.argmax(q_values)])
+        return action, self.corpus.words[action]
+
+    def learn(self, game:Game, state:int, action:int, reward:float):
+        new_row = game.q_table.get(action, {})
+        new_state_max = max(new_row.get(i, 0) for i in game.candidates)
+        q_row = game.q_table.setdefault(state, {})
+        q_value = q_row.get(action, 0)
+        q_row[action] = (1 - self.alpha)*q_value + self.alpha*(reward + self.gamma*new_state_max - q_value)
+
+''' Q-learning over cluster-cluster pairs. The state is the cluster of the current word and the action the cluster
+the next word is picked from, the Q-table is shared (and keeps learning) across every game of the policy. '''
+
+class QClusterPolicy(Policy):
+    name = 'RL Cluster'
+
+    def __init__(self, learning_rate:float, exploration_rate:float, shrinkage_factor:float,
+                 number_of_cluster:int, cluster_assignment:np.ndarray, Q_table:np.ndarray,
+                 corpus_kind:str='accepted', goal_kind:str='goal', rng=None):
+        super().__init__(rng)
+        self.alpha = learning_rate  # learning rate
+        self.epsilon = exploration_rate  # probability of exploration
+        self.gamma = shrinkage_factor  # discounting factor
+        self.number_of_cluster = number_of_cluster
+        self.cluster_assignment = np.asarray(cluster_assignment)
+        self.q_table = Q_table
+        self.corpus_kind = corpus_kind
+        self.goal_kind = goal_kind
+
+    def new_game(self, wordle:Wordle):
+        game = Game(np.arange(len(self.corpus)), self.epsilon)
+        # initialize the first word cluster number
+        wordle.current_state = self.cluster_assignment[self.corpus.index[wordle.get_curr_word()]]
+        return game
+
+    def observe(self, game:Game, guess:str, feedback:str):
+        # Unlike wordle_base we can remove the word we filtering on, since our state-action pair is cluster-cluster
+        game.candidates = eval.filter_candidates(self.corpus, game.candidates, self.corpus.index.get(guess, -1),
+                                                 feedback, keep_filter_word=False, filter_word=guess)
+
+    def get_state(self, word:str):
+        position = self.corpus.index.get(word)
+        return None if position is None else self.cluster_assignment[position]
+
+    def get_states_to_explore(self, state:int, cluster_results:np.ndarray):
+        list_of_states_to_explore = np.unique(cluster_results).tolist()
+        if len(list_of_states_to_explore) != 1:
+            if state in list_of_states_to_explore:
+                list_of_states_to_explore.remove(state)
+        return list_of_states_to_explore
+
+    def choose(self, game:Game, state:int, steps:int):
+        q_table = self.q_table
+        cluster_results = self.cluster_assignment[game.candidates]
+        game.epsilon = game.epsilon / (steps ** 2) # Decaying epsilon, explore lesser as it goes on
+        if self.rng.uniform(0, 1) < game.epsilon: # Explore
+            action_index = self.rng.choice(self.get_states_to_explore(state, cluster_results))
+        else: #Exploit
+            # Q-table is very sparse in beginning, hence if the row of Q-table all similar still (0), do exploration still
+            # Only the clusters that still have candidates can be played
+            playable = np.unique(cluster_results)
+            q_values = q_table[state][playable]
+            if np.all(q_values == q_values[0]):
+                action_index = self.rng.choice(self.get_states_to_explore(state, cluster_results))
+            else: # Exploit
+                action_index = int(playable[np.argmax(q_values)])
+
+        # Pick a random word from the chosen cluster
+        chosen_position = self.rng.choice(game.candidates[cluster_results == action_index])
+        return action_index, self.corpus.words[chosen_position]
+
+    def learn(self, game:Game, state:int, action:int, reward:float):
+        q_table = self.q_table
+        new_state_max = np.max(q_table[action])
+        q_table[state, action] = (1 - self.alpha)*q_table[state, action] + self.alpha*(
+            reward + self.gamma*new_state_max - q_table[state, action])
+
+''' Greedy search, always guesses the best scoring word that is still possible. Every game starts from the shared
+score order and only keeps its own candidates (corpus positions, best score first) and the letters still allowed at
+each position (26 bit masks, the toEvaluate strings of solveWithAll). observe applies the green, yellow and grey
+rules of solveWithAll in one pass over the candidates and leaves a new, smaller array, so nothing shared is ever
+modified. '''
+
+class GreedyPolicy(Policy):
+    name = 'Greedy Search'
+
+    def __init__(self, scoring:str='occurrence', corpus_kind:str='accepted', goal_kind:str='goal', rng=None):
+        super().__init__(rng)
+        self.scoring = scoring
+        self.corpus_kind = corpus_kind
+        self.goal_kind = goal_kind
+
+    def new_game(self, wordle:Wordle):
+        game = Game(get_score_order(self.corpus_kind, self.scoring))
+        game.allowed_letters = ((1 << 26) - 1,) * 5
+        return game
+
+    def get_feedback(self, guess:str, goal:str):
+        return evalGuess(guess, goal)
+
+    def get_feedback_from_colors(self, guess:str, evaluation:list):
+        return list(evaluation)
+
+    def observe(self, game:Game, guess:str, feedback:list):
+        allowed_letters = list(game.allowed_letters)
+        yellow_mask = 0
+        for i, colour in enumerate(feedback):
+            letter_bit = 1 << (ord(guess[i]) - ord('A'))
+            if colour == 'g':
+                allowed_letters[i] = letter_bit
+            else:
+                allowed_letters[i] &= ~letter_bit
+                if colour == 'y':
+                    yellow_mask |= letter_bit
+
+        candidates = game.candidates
+        letters = self.corpus.letters[candidates]
+        # Every letter allowed at its position, every yellow letter somewhere in the word, and not the guess itself
+        keep = np.all((np.array(allowed_letters, dtype=np.uint32) >> letters) & 1, axis=1)
+        if yellow_mask:
+            keep &= (self.corpus.letter_masks[candidates] & yellow_mask) == yellow_mask
+        keep &= candidates != self.corpus.index.get(guess, -1)
+        game.candidates = candidates[keep]
+        game.allowed_letters = tuple(allowed_letters)
+
+    def choose(self, game:Game, state, steps:int):
+        return None, self.corpus.words[game.candidates[0]]
+
+''' Entropy search, guesses the remaining candidate whose feedback splits the remaining candidates into the most
+evenly sized groups (highest entropy), using the shared feedback table. Guesses and goals share one corpus. '''
+
+class EntropyPolicy(Policy):
+    name = 'Entropy Search'
+
+    def __init__(self, corpus_kind:str='goal', rng=None):
+        super().__init__(rng)
+        self.corpus_kind = corpus_kind
+        self.goal_kind = corpus_kind
+
+    def get_feedback(self, guess:str, goal:str):
+        table = get_feedback_table(self.corpus_kind, self.corpus_kind)
+        return int(table[self.corpus.index[guess], self.corpus.index[goal]])
+
+    def get_feedback_from_colors(self, guess:str, evaluation:list):
+        return encode_feedback(evaluation)
+
+    def observe(self, game:Game, guess:str, feedback:int):
+        candidates = game.candidates
+        if guess not in self.corpus.index:
+            # A guess from outside the corpus (e.g. typed into a live game), its feedback row is computed on the fly
+            guess_letters = np.frombuffer(guess.encode('ascii'), dtype=np.uint8).reshape(1, 5) - ord('A')
+            codes = get_feedback_codes(guess_letters, self.corpus.letters[candidates])[0]
+            game.candidates = candidates[codes == feedback]
+            return
+        table = get_feedback_table(self.corpus_kind, self.corpus_kind)
+        guess_position = self.corpus.index[guess]
+        game.candidates = candidates[(table[guess_position, candidates] == feedback) & (candidates != guess_position)]
+
+    def choose(self, game:Game, state, steps:int):
+        candidates = game.candidates
+        if len(candidates) <= 2:
+            return None, self.corpus.words[candidates[0]]
+        table = get_feedback_table(self.corpus_kind, self.corpus_kind)
+        # Count how many candidates fall in each of the 243 feedback groups for every candidate guess
+        rows = np.arange(len(candidates))[:, None] * 243
+        feedback = table[np.ix_(candidates, candidates)] + rows
+        counts = np.bincount(feedback.ravel(), minlength=len(candidates)*243).reshape(len(candidates), 243)
+        probabilities = counts / len(candidates)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            entropy = -np.nansum(probabilities * np.log2(probabilities), axis=1)
+        return None, self.corpus.words[candidates[np.argmax(entropy)]]
+
+''' Game loop shared by every policy, one call is one game of wordle. Returns the number of guesses and the
+words guessed, the same as each model's reinforcement_learning used to. '''
+
+def play(policy:Policy, goal_word:str=None, initial_word:str='CRANE'):
+    wordle = Wordle(initial_word, goal_word, policy.get_goal_words(), policy.rng)
+    done = False
+    steps = 1 # Since we start off with an initial word already
+
+    goal_word = wordle.get_goal()
+    if goal_word == initial_word:
+        return 1, [initial_word]
+
+    game = policy.new_game(wordle)
+    visited_words = []
+    while not done:
+        state = wordle.get_state()
+        guess = wordle.get_curr_word()
+        visited_words.append(guess)
+
+        # keep track of the corpus after filtering (cutting search space)
+        policy.observe(game, guess, policy.get_feedback(guess, goal_word))
+
+        # Get reward and learn from it
+        action, word = policy.choose(game, state, steps)
+        reward, done = wordle.make_action(word, action)
+        policy.learn(game, state, action, reward)
+
+        # Increment the steps
+        steps = steps + 1
+
+        # Exit condition in case search too long, set currently to total length of initial corpus
+        if steps >= len(policy.corpus):
+            break
+
+    visited_words.append(goal_word)
+    return steps, visited_words
+
+''' Streaming simulations: one record per game, yielded as soon as the game is finished, so callers can watch the
+games as they come, stop early (e.g. on a confidence criterion) or write them to disk one by one. Each record is a
+dict with the epoch (0, 1, ...), the target word, the number of steps, the visited words and the time the game took.
+With num_simulations=None the games go on until the caller stops iterating.'''
+
+def iter_simulations(policy:Policy, num_simulations:int=None, initial_word:str='CRANE'):
+    epoch = 0
+    while num_simulations is None or epoch < num_simulations:
+        toc = time.time()
+        steps, visited_words = play(policy, initial_word=initial_word)
+        tic = time.time()
+        yield {'epoch': epoch,
+               'target': visited_words[-1],
+               'steps': steps,
+               'visited_words': visited_words,
+               'time': tic - toc}
+        epoch += 1
+
+''' Define a function where one simulation/run is one run of the wordle game, built on iter_simulations'''
+
+def run_simulations(policy:Policy, num_simulations:int, progress=None, cancel=None, writer=None,
+                    initial_word:str='CRANE'):
+    # progress(epoch, steps) is called after every game, setting the cancel event (threading.Event) stops the run
+    # early and returns the results of the games played so far. Every game is also appended to the writer
+    # (a result_store.ResultWriter) if there is one, and the writer is flushed when the run ends
+    from tqdm import tqdm
+    guesses = np.zeros(num_simulations)
+    games = 0
+    toc = time.time()
+    if cancel is None or not cancel.is_set():
+        for record in tqdm(iter_simulations(policy, num_simulations, initial_word), total=num_simulations):
+            guesses[record['epoch']] = record['steps']
+            games += 1
+            if writer is not None:
+                writer.append(record)
+            if progress is not None:
+                progress(record['epoch'], record['steps'])
+            if cancel is not None and cancel.is_set():
+                break
+    guesses = guesses[:games]
+    if writer is not None:
+        writer.flush()
+    tic = time.time()
+
+    time_taken = tic - toc
+    average_guesses = np.mean(guesses) if len(guesses) else np.nan
+    win_rate = (len(guesses)-np.sum(guesses>6))/max(len(guesses), 1)*100
+    return time_taken, average_guesses, win_rate, guesses
@@ -0,0 +1,154 @@
+'''Sequential-stopping evaluation of the models.
+
+analysis.ipynb plays a fixed 10000 games per model and builds t-based confidence intervals afterwards. Here the
+games are consumed one at a time from a model's iter_simulations and running statistics (Welford's algorithm) are
+kept for the number of guesses and for the win indicator. The evaluation stops as soon as both confidence intervals
+are narrower than the requested widths, so models that converge quickly finish in a fraction of the games:
+
+    python -m models.evaluation --model cluster_2k --guesses-width 0.1 --win-rate-width 2
+
+Like the notebook, the first burn_in games (while the Q-table is still learning) can be left out, and the
+statistics can be kept over batch means of batch_size games instead of single games.'''
+
+import time
+import argparse
+import numpy as np
+from models import (wordle_base_15k, wordle_cluster_15k, wordle_cluster_2k,
+                    wordle_greedy_search_15k, wordle_greedy_search_2k)
+from models.result_cache import EVALUATION_RUNS, MODELS
+
+# Mean and variance updated one value at a time (Welford's algorithm)
+class RunningStats():
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value:float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.inf
+
+    # Half the width of the t-based confidence interval on the mean
+    def half_width(self, confidence:float=0.95):
+        if self.count < 2:
+            return np.inf
+        from scipy.stats import t
+        t_crit = np.abs(t.ppf((1 - confidence) / 2, self.count - 1))
+        return t_crit * np.sqrt(self.variance() / self.count)
+
+    def interval(self, confidence:float=0.95):
+        half_width = self.half_width(confidence)
+        return self.mean - half_width, self.mean + half_width
+
+# Wilson score interval on a win rate (in %), unlike p +/- z*sqrt(p(1-p)/n) it keeps a width when every game so far
+# was won (or lost)
+def wilson_interval(wins:int, games:int, confidence:float=0.95):
+    if games == 0:
+        return 0.0, 100.0
+    from scipy.stats import norm
+    z = norm.ppf(1 - (1 - confidence) / 2)
+    p = wins / games
+    denominator = 1 + z**2 / games
+    centre = (p + z**2 / (2 * games)) / denominator
+    half_width = z * np.sqrt(p * (1 - p) / games + z**2 / (4 * games**2)) / denominator
+    return (centre - half_width) * 100, (centre + half_width) * 100
+
+# Streaming records of one of the models (see result_cache.MODELS), parameters a model does not use are ignored
+def iter_model(model:str, learning_rate=None, exploration_rate=None, shrinkage_factor=None, num_clusters=None,
+               num_simulations:int=None, seed=None):
+    if model == 'base_15k':
+        return wordle_base_15k.iter_simulations(learning_rate, exploration_rate, shrinkage_factor,
+                                                num_simulations, seed=seed)
+    if model == 'cluster_15k':
+        return wordle_cluster_15k.iter_simulations(learning_rate, exploration_rate, shrinkage_factor, int(num_clusters),
+                                                   num_simulations, seed=seed)
+    if model == 'cluster_2k':
+        return wordle_cluster_2k.iter_simulations(learning_rate, exploration_rate, shrinkage_factor, int(num_clusters),
+                                                  num_simulations, seed=seed)
+    if model == 'greedy_search_15k':
+        return wordle_greedy_search_15k.iter_simulations(num_simulations, seed=seed)
+    if model == 'greedy_search_2k':
+        return wordle_greedy_search_2k.iter_simulations(num_simulations, seed=seed)
+    raise ValueError(f"Unknown model '{model}', expected one of {MODELS}")
+
+''' Plays games from records (any iterable of iter_simulations records) until the confidence intervals on the mean
+number of guesses and on the win rate (in %) are narrower than guesses_width and win_rate_width, or until
+max_games games were played. The interval on the guesses is t-based on the batch means, the one on the win rate a
+Wilson interval on the games of those batches, so it doesn't collapse to zero width while no game was lost. The
+intervals are checked every check_every batches and only once there are at least min_batches batches, so the
+stopping rule does not fire on a lucky start.'''
+
+def sequential_evaluation(records,
+                          guesses_width:float=0.1,
+                          win_rate_width:float=2.0,
+                          confidence:float=0.95,
+                          burn_in:int=0,
+                          batch_size:int=1,
+                          min_batches:int=30,
+                          max_games:int=10000,
+                          check_every:int=10):
+    guesses_stats = RunningStats()
+    wins, games = 0, 0
+    guesses = []
+    batch = []
+    converged = False
+
+    toc = time.time()
+    for record in records:
+        guesses.append(record['steps'])
+        if len(guesses) > burn_in:
+            batch.append(record['steps'])
+            if len(batch) == batch_size:
+                batch = np.array(batch)
+                guesses_stats.update(batch.mean())
+                wins += int(np.sum(batch <= 6))
+                games += len(batch)
+                batch = []
+
+                if guesses_stats.count >= min_batches and guesses_stats.count % check_every == 0:
+                    low, high = wilson_interval(wins, games, confidence)
+                    if 2 * guesses_stats.half_width(confidence) < guesses_width and high - low < win_rate_width:
+                        converged = True
+                        break
+        if len(guesses) >= max_games:
+            break
+    tic = time.time()
+
+    return {'games': len(guesses),
+            'converged': converged,
+            'time_taken': tic - toc,
+            'average_guesses': guesses_stats.mean,
+            'guesses_ci': guesses_stats.interval(confidence),
+            'win_rate': wins / games * 100 if games else np.nan,
+            'win_rate_ci': wilson_interval(wins, games, confidence),
+            'guesses': np.array(guesses)}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Evaluate a model until its confidence intervals are narrow enough.')
+    parser.add_argument('--model', choices=MODELS, default='cluster_2k')
+    parser.add_argument('--guesses-width', type=float, default=0.1, help='width of the interval on the mean guesses')
+    parser.add_argument('--win-rate-width', type=float, default=2.0, help='width of the interval on the win rate (%%)')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--burn-in', type=int, default=0, help='games left out at the start')
+    parser.add_argument('--batch-size', type=int, default=1, help='games per batch mean')
+    parser.add_argument('--max-games', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    # The parameters analysis.ipynb evaluated each model with
+    _, learning_rate, exploration_rate, shrinkage_factor, num_clusters, _ = next(
+        run for run in EVALUATION_RUNS if run[0] == args.model)
+    records = iter_model(args.model, learning_rate, exploration_rate, shrinkage_factor, num_clusters, seed=args.seed)
+    result = sequential_evaluation(records, args.guesses_width, args.win_rate_width, args.confidence,
+                                   args.burn_in, args.batch_size, max_games=args.max_games)
+
+    print(f"{args.model}: {result['games']} games in {result['time_taken']:.1f}s "
+          f"({'converged' if result['converged'] else 'stopped at max games'})")
+    print(f"Average guesses: {result['average_guesses']:.3f}, "
+          f"CI ({result['guesses_ci'][0]:.3f}, {result['guesses_ci'][1]:.3f})")
+    print(f"Win rate: {result['win_rate']:.2f}%, CI ({result['win_rate_ci'][0]:.2f}, {result['win_rate_ci'][1]:.2f})")
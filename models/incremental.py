@@ -0,0 +1,224 @@
+'''Incremental rebuild of the word list artifacts.
+
+The Levenshtein distances of a corpus (for the agglomerative clustering), its cluster labels and the feedback tables
+are quadratic in the number of words, and used to be rebuilt from scratch in every process. They are now kept in a
+build cache, models/build_cache/, as bundles (see artifacts.py) that hold the words they were built on:
+
+    distances_<kind>/            words, distances (condensed uint8, as Clustering.get_dist_matrix builds them)
+    feedback_<guess>_<target>/   guesses, targets, table (as engine.get_feedback_table builds it)
+    clusters_<kind>_<k>/         words, labels, and in the metadata the drift of the labels and the number of words
+                                 of the last full clustering
+
+When the word lists change (a new goal_words.txt or accepted_words.txt), the words are matched against the cached
+build: the values of two words that were already there are copied over, only the rows and columns of the added words
+are computed, and the removed ones are dropped. Adding a few words to the 12974 accepted words costs a few times 12974
+distances instead of 84 million.
+
+Cluster labels are updated the same way: the words already there keep their cluster (so a Q-table learnt on the
+clusters still lines up) and an added word joins the cluster with the lowest mean distance to its members, the
+centroid distance of average linkage. The words added and removed since the last full clustering, as a fraction of
+the words clustered then, are the drift of the labels. Past DRIFT_THRESHOLD, or if a cluster lost all its words,
+the corpus is clustered again from the (cached) distances.
+
+    python -m models.incremental --kind goal --clusters 9'''
+
+import os
+import time
+import argparse
+import numpy as np
+from models import artifacts, engine, vocabulary
+
+BUILD_CACHE_PATH = 'models/build_cache'
+DRIFT_THRESHOLD = 0.05
+
+# Positions of the words of new_words already in old_words (in new_words and in old_words), and of the added ones
+def match_words(old_words, new_words):
+    old_index = {word: position for position, word in enumerate(old_words)}
+    old_positions = np.array([old_index.get(word, -1) for word in new_words], dtype=np.int64)
+    kept = np.flatnonzero(old_positions >= 0)
+    return kept, old_positions[kept], np.flatnonzero(old_positions < 0)
+
+# Position of the pairs (i, j), i != j, in the condensed upper triangle of the distances of n words
+def condensed_index(n:int, i:np.ndarray, j:np.ndarray):
+    i, j = np.minimum(i, j).astype(np.int64), np.maximum(i, j).astype(np.int64)
+    return n*i - i*(i + 1)//2 + j - i - 1
+
+def decode_words(words:np.ndarray):
+    return [word.decode('ascii') for word in words]
+
+# Arrays and metadata of a cached bundle, None if it is missing or unreadable
+def read_cache(name:str, names:tuple):
+    try:
+        return artifacts.read_bundle(os.path.join(BUILD_CACHE_PATH, name), names)
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+def write_cache(name:str, arrays:dict, metadata:dict):
+    os.makedirs(BUILD_CACHE_PATH, exist_ok=True)
+    artifacts.write_bundle(os.path.join(BUILD_CACHE_PATH, name), arrays, dict(metadata, created=time.time()))
+
+''' Levenshtein distances of the words, from the distances of the old words. Only the pairs with an added word are
+computed, row by row of the condensed matrix the pairs of two old words are gathered from the old one. '''
+
+def update_distances(old_words:list, old_distances:np.ndarray, words:list):
+    n = len(words)
+    kept, old_positions, added = match_words(old_words, words)
+    old_of_new = np.full(n, -1, dtype=np.int64)
+    old_of_new[kept] = old_positions
+    added_column = np.full(n, -1, dtype=np.int64)
+    added_column[added] = np.arange(len(added))
+    added_distances = engine.Clustering(1).get_distances_to(words, [words[i] for i in added])
+
+    distances = np.zeros(n*(n-1)//2, dtype=np.uint8)
+    start = 0
+    for i in range(n - 1):
+        end = start + n - i - 1
+        columns = np.arange(i + 1, n)
+        if old_of_new[i] < 0:
+            distances[start:end] = added_distances[columns, added_column[i]]
+        else:
+            from_old = old_of_new[columns] >= 0
+            row = distances[start:end]
+            row[from_old] = old_distances[condensed_index(len(old_words), old_of_new[i], old_of_new[columns[from_old]])]
+            row[~from_old] = added_distances[i, added_column[columns[~from_old]]]
+        start = end
+    return distances
+
+''' Feedback table of the guess and target corpora, from the table of the old guesses and targets. Only the rows of
+the added guesses and the columns of the added targets are computed. '''
+
+def update_feedback_table(old_guesses:list, old_targets:list, old_table:np.ndarray, guess_kind:str, target_kind:str,
+                          chunk_size:int=256):
+    guess_corpus, target_corpus = engine.get_corpus(guess_kind), engine.get_corpus(target_kind)
+    kept_guesses, old_guess_positions, added_guesses = match_words(old_guesses, guess_corpus.words)
+    kept_targets, old_target_positions, added_targets = match_words(old_targets, target_corpus.words)
+    table = np.zeros((len(guess_corpus), len(target_corpus)), dtype=np.uint8)
+    table[np.ix_(kept_guesses, kept_targets)] = old_table[np.ix_(old_guess_positions, old_target_positions)]
+    table[added_guesses] = engine.compute_feedback_table(guess_corpus.letters[added_guesses], target_corpus.letters,
+                                                         chunk_size)
+    table[np.ix_(kept_guesses, added_targets)] = engine.compute_feedback_table(
+        guess_corpus.letters[kept_guesses], target_corpus.letters[added_targets], chunk_size)
+    return table
+
+# Condensed Levenshtein distances of the corpus, from the build cache
+def get_distance_matrix(corpus_kind:str, report=None):
+    name = f'distances_{corpus_kind}'
+    arrays, metadata = read_cache(name, ('words', 'distances'))
+    words = engine.get_corpus(corpus_kind).words
+    words_hash = vocabulary.get_words_hash(corpus_kind)
+    if metadata is not None and metadata['words_hash'] == words_hash:
+        return arrays['distances']
+
+    toc = time.time()
+    if metadata is None:
+        distances = engine.Clustering(1).get_dist_matrix(words)
+        message = f'all {len(distances)} pairs computed'
+    else:
+        old_words = decode_words(arrays['words'])
+        distances = update_distances(old_words, arrays['distances'], words)
+        kept, _, added = match_words(old_words, words)
+        message = f'{len(added)} words added, {len(old_words) - len(kept)} removed'
+    write_cache(name, {'words': np.array(words, dtype='S5'), 'distances': distances}, {'words_hash': words_hash})
+    if report is not None:
+        report(f'{name}: {message} in {time.time() - toc:.1f}s')
+    distances.flags.writeable = False
+    return distances
+
+# Feedback table of the guess and target corpora, from the build cache
+def get_feedback_table(guess_kind:str='goal', target_kind:str='goal', chunk_size:int=256, report=None):
+    name = f'feedback_{guess_kind}_{target_kind}'
+    arrays, metadata = read_cache(name, ('guesses', 'targets', 'table'))
+    hashes = [vocabulary.get_words_hash(guess_kind), vocabulary.get_words_hash(target_kind)]
+    if metadata is not None and metadata['words_hash'] == hashes:
+        return arrays['table']
+
+    toc = time.time()
+    guesses, targets = engine.get_corpus(guess_kind).words, engine.get_corpus(target_kind).words
+    if metadata is None:
+        table = engine.compute_feedback_table(engine.get_corpus(guess_kind).letters,
+                                              engine.get_corpus(target_kind).letters, chunk_size)
+        message = f'all {table.size} pairs computed'
+    else:
+        old_guesses, old_targets = decode_words(arrays['guesses']), decode_words(arrays['targets'])
+        table = update_feedback_table(old_guesses, old_targets, arrays['table'], guess_kind, target_kind, chunk_size)
+        message = (f'{len(match_words(old_guesses, guesses)[2])} guesses and '
+                   f'{len(match_words(old_targets, targets)[2])} targets added')
+    write_cache(name, {'guesses': np.array(guesses, dtype='S5'), 'targets': np.array(targets, dtype='S5'),
+                       'table': table}, {'words_hash': hashes})
+    if report is not None:
+        report(f'{name}: {message} in {time.time() - toc:.1f}s')
+    table.flags.writeable = False
+    return table
+
+# Full agglomerative clustering of the corpus, on the cached distances
+def cluster_words(corpus_kind:str, number_of_cluster:int):
+    words = engine.get_corpus(corpus_kind).words
+    return engine.Clustering(number_of_cluster).get_clusters(words, get_distance_matrix(corpus_kind))
+
+''' Labels of the corpus words from the labels of the old words: the words still there keep their cluster, the
+added ones join the cluster with the lowest mean distance to its members. The drift of the old labels grows by the
+words added and removed over clustered_words, the number of words of the last full clustering (the old words if not
+given). Returns the labels and the drift, the labels are None if the drift goes over the threshold or a cluster lost
+every word (the corpus needs a full clustering then). '''
+
+def update_cluster_labels(old_words:list, old_labels:np.ndarray, corpus_kind:str, drift:float=0.0,
+                          threshold:float=DRIFT_THRESHOLD, clustered_words:int=None):
+    words = engine.get_corpus(corpus_kind).words
+    kept, old_positions, added = match_words(old_words, words)
+    drift += (len(added) + len(old_words) - len(kept)) / (clustered_words or len(old_words))
+    number_of_cluster = int(np.max(old_labels)) + 1
+    labels = np.full(len(words), -1, dtype=np.intp)
+    labels[kept] = old_labels[old_positions]
+    if drift > threshold or len(np.unique(labels[kept])) < number_of_cluster:
+        return None, drift
+
+    if len(added):
+        distances = get_distance_matrix(corpus_kind)
+        added_distances = distances[condensed_index(len(words), added[:, None], kept[None, :])]
+        mean_distances = np.stack([added_distances[:, labels[kept] == cluster].mean(axis=1)
+                                   for cluster in range(number_of_cluster)], axis=1)
+        labels[added] = np.argmin(mean_distances, axis=1)
+    return labels, drift
+
+# Cluster labels of the corpus, from the build cache
+def get_cluster_assignment(corpus_kind:str, number_of_cluster:int, threshold:float=DRIFT_THRESHOLD, report=None):
+    name = f'clusters_{corpus_kind}_{number_of_cluster}'
+    arrays, metadata = read_cache(name, ('words', 'labels'))
+    words_hash = vocabulary.get_words_hash(corpus_kind)
+    if metadata is not None and metadata['words_hash'] == words_hash:
+        return arrays['labels']
+
+    toc = time.time()
+    words = engine.get_corpus(corpus_kind).words
+    labels, drift, clustered_words = None, 0.0, len(words)
+    if metadata is not None:
+        old_words = decode_words(arrays['words'])
+        clustered_words = metadata.get('clustered_words', len(old_words))
+        labels, drift = update_cluster_labels(old_words, arrays['labels'], corpus_kind, metadata['drift'], threshold,
+                                              clustered_words)
+    if labels is None:
+        labels, message = cluster_words(corpus_kind, number_of_cluster), f'clustered (drift {drift:.3f})'
+        drift, clustered_words = 0.0, len(words)
+    else:
+        message = f'labels updated (drift {drift:.3f})'
+    write_cache(name, {'words': np.array(words, dtype='S5'), 'labels': labels},
+                {'words_hash': words_hash, 'drift': drift, 'clustered_words': clustered_words})
+    if report is not None:
+        report(f'{name}: {message} in {time.time() - toc:.1f}s')
+    labels.flags.writeable = False
+    return labels
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bring the cached word list artifacts up to date with the word lists.')
+    parser.add_argument('--kind', choices=('goal', 'accepted'), default='goal', help='corpus to build for')
+    parser.add_argument('--clusters', type=int, default=9, help='number of clusters of the corpus')
+    parser.add_argument('--threshold', type=float, default=DRIFT_THRESHOLD, help='drift that triggers a full clustering')
+    args = parser.parse_args()
+
+    get_distance_matrix(args.kind, report=print)
+    get_feedback_table(args.kind, args.kind, report=print)
+    get_cluster_assignment(args.kind, args.clusters, args.threshold, report=print)
+    if args.kind == 'goal':
+        artifacts.load_pygame_model(args.clusters)
+        print(f'{artifacts.PYGAME_MODEL_PATH}: up to date with the goal words')
+    print(f'{BUILD_CACHE_PATH} is up to date')
@@ -0,0 +1,109 @@
+'''Result cache for model comparison runs.
+
+A run of a model is identified by (model, learning_rate, exploration_rate, shrinkage_factor, num_clusters, num_sims,
+version), where model is one of MODELS and parameters a model does not use are stored as None (the greedy models have
+no hyper-parameters, the base model has no clusters). version is the MODEL_VERSIONS entry of the model when the run
+was played, so runs of an older version of a model are never returned for the current code. Each entry keeps the
+time_taken, average_guesses and win_rate of the run, plus the guesses of every game when they are known.
+
+Runs stored with put() are kept in memory and written to evaluation_results/result_cache.json. The grid search and
+evaluation results in the repo are not loaded: they were played with 100 and 10000 simulations, more than the apps
+ever ask for.'''
+
+import os
+import json
+import threading
+import numpy as np
+from functools import lru_cache
+
+RESULT_CACHE_PATH = 'evaluation_results/result_cache.json'
+
+MODELS = ('base_15k', 'cluster_15k', 'cluster_2k', 'greedy_search_15k', 'greedy_search_2k')
+
+# Version of the algorithm of every model, bumped whenever a change to its policy (see engine.py) changes its results
+MODEL_VERSIONS = {'base_15k': 2, 'cluster_15k': 2, 'cluster_2k': 2, 'greedy_search_15k': 1, 'greedy_search_2k': 1}
+
+# The runs of evaluation_results/results.csv, in the order analysis.ipynb ran them, with the parameters it used
+EVALUATION_RUNS = [('base_15k', 0.1, 0.8, 0.8, None, 'evaluation_results/base_guesses.npy'),
+                   ('cluster_15k', 0.1, 0.5, 0.9, 6, 'evaluation_results/cluster_guesses.npy'),
+                   ('cluster_2k', 0.001, 0.9, 0.9, 9, 'evaluation_results/cluster_2_guesses.npy'),
+                   ('greedy_search_15k', None, None, None, None, 'evaluation_results/greedy_search_guesses.npy'),
+                   ('greedy_search_2k', None, None, None, None, 'evaluation_results/greedy_search_2_guesses.npy')]
+
+# Normalized cache key, the slider values of the apps are rounded so 0.30000000000000004 and 0.3 are the same run.
+# The version is the current one of the model unless given
+def make_key(model:str, learning_rate=None, exploration_rate=None, shrinkage_factor=None, num_clusters=None,
+             num_sims:int=100, version:int=None):
+    if model not in MODELS:
+        raise ValueError(f"Unknown model '{model}', expected one of {MODELS}")
+    if model.startswith('greedy_search'):
+        learning_rate = exploration_rate = shrinkage_factor = None
+    if not model.startswith('cluster'):
+        num_clusters = None
+    rounded = lambda value: None if value is None else round(float(value), 6)
+    return (model, rounded(learning_rate), rounded(exploration_rate), rounded(shrinkage_factor),
+            None if num_clusters is None else int(num_clusters), int(num_sims),
+            MODEL_VERSIONS[model] if version is None else int(version))
+
+class ResultCache():
+    def __init__(self, path:str=RESULT_CACHE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.results = {}
+        self.load()
+
+    # Load the runs persisted by earlier sessions
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r') as file:
+            for item in json.load(file):
+                # Runs saved before the versions were added were all played with version 1
+                key = make_key(item['model'], item['learning_rate'], item['exploration_rate'],
+                               item['shrinkage_factor'], item['num_clusters'], item['num_sims'],
+                               item.get('version', 1))
+                self.results[key] = self.make_entry(item['time_taken'], item['average_guesses'], item['win_rate'],
+                                                    item['guesses'])
+
+    def save(self):
+        fields = ('model', 'learning_rate', 'exploration_rate', 'shrinkage_factor', 'num_clusters', 'num_sims',
+                  'version')
+        items = []
+        for key, (time_taken, average_guesses, win_rate, guesses) in self.results.items():
+            item = dict(zip(fields, key))
+            item.update(time_taken=time_taken, average_guesses=average_guesses, win_rate=win_rate,
+                        guesses=None if guesses is None else guesses.tolist())
+            items.append(item)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path + '.tmp', 'w') as file:
+            json.dump(items, file)
+        os.replace(self.path + '.tmp', self.path)
+
+    @staticmethod
+    def make_entry(time_taken, average_guesses, win_rate, guesses=None):
+        guesses = None if guesses is None else np.asarray(guesses, dtype=float)
+        return float(time_taken), float(average_guesses), float(win_rate), guesses
+
+    # (time_taken, average_guesses, win_rate, guesses) of a cached run, guesses is None if unknown. None on a miss
+    def get(self, model:str, learning_rate=None, exploration_rate=None, shrinkage_factor=None, num_clusters=None,
+            num_sims:int=100):
+        key = make_key(model, learning_rate, exploration_rate, shrinkage_factor, num_clusters, num_sims)
+        with self.lock:
+            return self.results.get(key)
+
+    # Store the result tuple of a finished run (as returned by run_simulations) and persist it
+    def put(self, model:str, learning_rate, exploration_rate, shrinkage_factor, num_clusters, num_sims:int,
+            results:tuple):
+        key = make_key(model, learning_rate, exploration_rate, shrinkage_factor, num_clusters, num_sims)
+        entry = self.make_entry(*results)
+        with self.lock:
+            self.results[key] = entry
+            self.save()
+        return entry
+
+# The cache shared by everything in the process
+@lru_cache(maxsize=None)
+def get_result_cache():
+    return ResultCache()
@@ -0,0 +1,234 @@
+'''Append-only columnar store for per-game results.
+
+Every game played by the runners can be kept here with its target, number of steps, visited words and time, tagged
+with the model, its hyper-parameters and the seed of the run. The store is a directory of chunks:
+
+    evaluation_results/store/
+        manifest.jsonl          - one line per chunk: its run tags, number of rows and min/max of every column
+                                  (NaN left out, null if the column is all NaN)
+        <chunk id>/epoch.npy    - int32, game number within the run
+        <chunk id>/target.npy   - S5, goal word
+        <chunk id>/steps.npy    - int16, number of guesses
+        <chunk id>/time.npy     - float32, seconds the game took
+        <chunk id>/offsets.npy  - int32, game i visited paths[offsets[i]:offsets[i+1]]
+        <chunk id>/paths.npy    - S5, visited words of every game, flattened
+
+A chunk only holds games of one run, so the tags (model, learning_rate, exploration_rate, shrinkage_factor,
+num_clusters, seed, run) are stored once in the manifest and broadcast on read. Chunks are written to a temporary
+directory, renamed into place and only then added to the manifest, so several processes can write to the same store
+and readers never see half a chunk.
+
+Reads memory-map the column files and use the manifest for predicate pushdown: a chunk whose tags or min/max can't
+match the query is never opened. Writers write a chunk every chunk_size (1000) games, so a long run is in the store
+as it goes.
+
+    store = ResultStore()
+    for chunk in store.scan(['steps'], model='cluster_2k', steps=(7, None)):
+        ...
+    store.query(['target', 'steps'], model='greedy_search_2k', seed=1)'''
+
+import os
+import json
+import time
+import uuid
+import numpy as np
+
+RESULT_STORE_PATH = 'evaluation_results/store'
+
+COLUMNS = {'epoch': np.int32, 'target': 'S5', 'steps': np.int16, 'time': np.float32}
+TAGS = ('model', 'learning_rate', 'exploration_rate', 'shrinkage_factor', 'num_clusters', 'seed', 'run')
+
+# A predicate is either a value to compare with, or a (low, high) range with both ends included and None for open
+def matches_range(predicate, low, high):
+    if isinstance(predicate, tuple):
+        lower, upper = predicate
+        return (upper is None or low <= upper) and (lower is None or high >= lower)
+    return low <= predicate <= high
+
+# Text predicates can be given as str, the S5 columns hold bytes
+def encode_predicate(predicate):
+    encode = lambda value: value.encode('ascii') if isinstance(value, str) else value
+    return tuple(encode(value) for value in predicate) if isinstance(predicate, tuple) else encode(predicate)
+
+def get_row_mask(values:np.ndarray, predicate):
+    if isinstance(predicate, tuple):
+        lower, upper = predicate
+        mask = np.ones(len(values), dtype=bool)
+        if lower is not None:
+            mask &= values >= lower
+        if upper is not None:
+            mask &= values <= upper
+        return mask
+    return values == predicate
+
+class ResultWriter():
+    def __init__(self, store, tags:dict, chunk_size:int):
+        self.store = store
+        self.tags = tags
+        self.chunk_size = chunk_size
+        self.records = []
+
+    # Add one iter_simulations record, a chunk is written every chunk_size games
+    def append(self, record:dict):
+        self.records.append(record)
+        if len(self.records) >= self.chunk_size:
+            self.flush()
+
+    # Write the games not written yet as a chunk
+    def flush(self):
+        if self.records:
+            self.store.write_chunk(self.tags, self.records)
+            self.records = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+class ResultStore():
+    def __init__(self, path:str=RESULT_STORE_PATH):
+        self.path = path
+        self.manifest_path = os.path.join(path, 'manifest.jsonl')
+
+    # Writer for one run, model and hyper-parameters as in result_cache.make_key (None for the unused ones)
+    def writer(self, model:str, learning_rate=None, exploration_rate=None, shrinkage_factor=None, num_clusters=None,
+               seed=None, chunk_size:int=1000):
+        rounded = lambda value: None if value is None else round(float(value), 6)
+        tags = {'model': model,
+                'learning_rate': rounded(learning_rate),
+                'exploration_rate': rounded(exploration_rate),
+                'shrinkage_factor': rounded(shrinkage_factor),
+                'num_clusters': None if num_clusters is None else int(num_clusters),
+                'seed': seed,
+                'run': uuid.uuid4().hex}
+        return ResultWriter(self, tags, chunk_size)
+
+    def write_chunk(self, tags:dict, records:list):
+        columns = {name: np.array([record[name] for record in records], dtype=dtype)
+                   for name, dtype in COLUMNS.items()}
+        offsets = np.zeros(len(records) + 1, dtype=np.int32)
+        offsets[1:] = np.cumsum([len(record['visited_words']) for record in records])
+        paths = np.array([word for record in records for word in record['visited_words']], dtype='S5')
+
+        chunk = uuid.uuid4().hex
+        os.makedirs(self.path, exist_ok=True)
+        tmp_dir = os.path.join(self.path, f'.{chunk}.tmp')
+        os.makedirs(tmp_dir)
+        for name, values in columns.items():
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), values)
+        np.save(os.path.join(tmp_dir, 'offsets.npy'), offsets)
+        np.save(os.path.join(tmp_dir, 'paths.npy'), paths)
+        os.rename(tmp_dir, os.path.join(self.path, chunk))
+
+        stats = {}
+        for name, values in columns.items():
+            if values.dtype.kind == 'S':
+                ordered = np.sort(values)
+                stats[name] = [ordered[0].decode('ascii'), ordered[-1].decode('ascii')]
+            elif np.isnan(values).all():
+                stats[name] = None # NaN matches no predicate, so neither does the chunk
+            else:
+                stats[name] = [np.nanmin(values).item(), np.nanmax(values).item()]
+        entry = dict(tags, chunk=chunk, rows=len(records), created=time.time(), stats=stats)
+        # One short line per append, written in a single call so concurrent writers don't interleave
+        with open(self.manifest_path, 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+
+    def read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, 'r') as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    # True if the chunk may hold rows matching every predicate, from the manifest alone
+    def may_match(self, entry:dict, predicates:dict):
+        for name, predicate in predicates.items():
+            if name in TAGS:
+                if entry[name] != predicate:
+                    return False
+            elif name in COLUMNS:
+                if entry['stats'][name] is None:
+                    return False
+                low, high = entry['stats'][name]
+                if COLUMNS[name] == 'S5':
+                    low, high = low.encode('ascii'), high.encode('ascii')
+                if not matches_range(predicate, low, high):
+                    return False
+            else:
+                raise ValueError(f"Unknown column '{name}', expected one of {TAGS + tuple(COLUMNS)}")
+        return True
+
+    def load_column(self, chunk:str, name:str):
+        return np.load(os.path.join(self.path, chunk, f'{name}.npy'), mmap_mode='r')
+
+    ''' Yields one dict of columns per chunk with the rows matching the predicates (column=value or
+    column=(low, high)). Columns are the names in COLUMNS and TAGS, plus 'visited_words' for the list of guesses
+    of every game. Chunks are only opened if the manifest says they may match, and only the requested columns and
+    the columns of the predicates are read (memory-mapped).'''
+
+    def scan(self, columns=None, **predicates):
+        columns = list(columns) if columns is not None else list(COLUMNS)
+        predicates = {name: encode_predicate(predicate) if COLUMNS.get(name) == 'S5' else predicate
+                      for name, predicate in predicates.items()}
+        for entry in self.read_manifest():
+            if not self.may_match(entry, predicates):
+                continue
+
+            mask = np.ones(entry['rows'], dtype=bool)
+            for name, predicate in predicates.items():
+                if name in COLUMNS:
+                    mask &= get_row_mask(self.load_column(entry['chunk'], name), predicate)
+            if not mask.any():
+                continue
+
+            rows = np.flatnonzero(mask)
+            result = {}
+            for name in columns:
+                if name in TAGS:
+                    result[name] = np.full(len(rows), entry[name], dtype=object)
+                elif name == 'visited_words':
+                    offsets = self.load_column(entry['chunk'], 'offsets')
+                    paths = self.load_column(entry['chunk'], 'paths')
+                    result[name] = [[word.decode('ascii') for word in paths[offsets[row]:offsets[row + 1]]]
+                                    for row in rows]
+                else:
+                    result[name] = np.asarray(self.load_column(entry['chunk'], name)[rows])
+            yield result
+
+    # Every matching row of the store, the scan of every chunk concatenated
+    def query(self, columns=None, **predicates):
+        columns = list(columns) if columns is not None else list(COLUMNS)
+        chunks = list(self.scan(columns, **predicates))
+        result = {}
+        for name in columns:
+            if name == 'visited_words':
+                result[name] = [path for chunk in chunks for path in chunk[name]]
+            elif chunks:
+                result[name] = np.concatenate([chunk[name] for chunk in chunks])
+            else:
+                result[name] = np.array([], dtype=object if name in TAGS else COLUMNS[name])
+        return result
+
+''' The per-game guesses that analysis.ipynb saved to evaluation_results/*_guesses.npy, imported as one run per
+model. Targets, paths and times were never kept for those runs, so target is empty, paths hold nothing and time
+is nan.'''
+
+def import_evaluation_guesses(store:ResultStore):
+    from models.result_cache import EVALUATION_RUNS
+    for model, learning_rate, exploration_rate, shrinkage_factor, num_clusters, guesses_path in EVALUATION_RUNS:
+        if not os.path.exists(guesses_path):
+            continue
+        with store.writer(model, learning_rate, exploration_rate, shrinkage_factor, num_clusters) as writer:
+            for epoch, steps in enumerate(np.load(guesses_path)):
+                writer.append({'epoch': epoch, 'target': '', 'steps': int(steps), 'time': np.nan,
+                               'visited_words': []})
+
+if __name__ == '__main__':
+    store = ResultStore()
+    if not store.read_manifest():
+        import_evaluation_guesses(store)
+    for model in sorted({entry['model'] for entry in store.read_manifest()}):
+        steps = store.query(['steps'], model=model)['steps']
+        print(f'{model}: {len(steps)} games, average guesses {steps.mean():.3f}, '
+              f'win rate {np.mean(steps <= 6) * 100:.2f}%')
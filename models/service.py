@@ -0,0 +1,173 @@
+'''Local solver service.
+
+Every tool that imports the models pays the cold start of loading the vocabulary, building the feedback tables and
+greedy scores and loading the cluster labels and Q-table. This keeps one process running with all of that resident
+and answers over HTTP on localhost:
+
+    python -m models.service --port 8765
+
+    POST /next_guess  {"policy": "entropy", "history": [["CRANE", "bybbg"], ...]}
+                      -> {"guess": "...", "remaining": 12, "solved": false}
+    POST /solve       {"policy": "cluster_2k", "targets": ["CIGAR", ...], "seed": 0}
+                      -> {"results": [{"target": "CIGAR", "steps": 3, "visited_words": [...]}, ...]}
+    GET  /metrics     -> request count, errors and latency (mean, p50, p99, max in ms) per endpoint
+
+A history is the list of guesses played so far with the colors the game showed for each letter: 'g' green,
+'y' yellow and 'b' (or 'w', 'x', '-') grey, replayed through a session.SolverSession. Both endpoints take the
+policies of session.POLICIES: entropy, greedy_2k, greedy_15k and cluster_2k, the trained model of the pygame app.
+Requests are served concurrently, one thread each. SolverClient is a small client for the other tools.'''
+
+import json
+import time
+import random
+import argparse
+import threading
+import numpy as np
+from collections import deque
+from urllib import request as urllib_request
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from models import artifacts, engine, wordle_daily_2k
+from models.session import make_policy, parse_word, solve_history
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+# Build every table the policies use before the first request comes in
+def warm_up():
+    for kind in ('goal', 'accepted'):
+        engine.get_corpus(kind)
+        engine.get_word_scores(kind, 'occurrence')
+    engine.get_feedback_table('goal', 'goal')
+    artifacts.load_pygame_model(wordle_daily_2k.NUMBER_OF_CLUSTER)
+
+# Next guess of the policy after the given history, with the number of words still possible
+def next_guess(policy_name:str, history:list, initial_word:str='CRANE', seed=None):
+    session = solve_history(policy_name, history, parse_word(initial_word), random.Random(seed))
+    return {'guess': session.suggestion, 'remaining': session.remaining(), 'solved': session.solved}
+
+# Plays every target with the policy (a fresh one per request, so concurrent requests don't share a Q-table)
+def solve(policy_name:str, targets:list, seed=None, initial_word:str='CRANE'):
+    policy = make_policy(policy_name, rng=random.Random(seed))
+    goal_words = set(policy.get_goal_words())
+    results = []
+    for target in targets:
+        target = parse_word(target)
+        if target not in goal_words:
+            raise ValueError(f"'{target}' is not one of the goal words of {policy_name}")
+        steps, visited_words = engine.play(policy, goal_word=target, initial_word=initial_word)
+        results.append({'target': target, 'steps': steps, 'visited_words': visited_words})
+    return {'results': results}
+
+# Request timings per endpoint, the latest 10000 kept for the percentiles
+class Metrics():
+    def __init__(self, window:int=10000):
+        self.lock = threading.Lock()
+        self.window = window
+        self.counts = {}
+        self.errors = {}
+        self.latencies = {}
+
+    def record(self, endpoint:str, elapsed:float, error:bool=False):
+        with self.lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + int(error)
+            self.latencies.setdefault(endpoint, deque(maxlen=self.window)).append(elapsed * 1000)
+
+    def summary(self):
+        with self.lock:
+            summary = {}
+            for endpoint, latencies in self.latencies.items():
+                latencies = np.array(latencies)
+                summary[endpoint] = {'requests': self.counts[endpoint],
+                                     'errors': self.errors[endpoint],
+                                     'mean_ms': float(latencies.mean()),
+                                     'p50_ms': float(np.percentile(latencies, 50)),
+                                     'p99_ms': float(np.percentile(latencies, 99)),
+                                     'max_ms': float(latencies.max())}
+            return summary
+
+class SolverHandler(BaseHTTPRequestHandler):
+    metrics = Metrics()
+
+    def send_json(self, status:int, body:dict):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self.send_json(200, self.metrics.summary())
+        else:
+            self.send_json(404, {'error': f'Unknown endpoint {self.path}'})
+
+    def do_POST(self):
+        toc = time.perf_counter()
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if not isinstance(body, dict):
+                raise TypeError(f'Expected a JSON object as the request body, got {type(body).__name__}')
+            if self.path == '/next_guess':
+                result = next_guess(body.get('policy', 'entropy'), body.get('history', []),
+                                    body.get('initial_word', 'CRANE'), body.get('seed'))
+            elif self.path == '/solve':
+                result = solve(body.get('policy', 'entropy'), body.get('targets', []), body.get('seed'),
+                               body.get('initial_word', 'CRANE'))
+            else:
+                self.metrics.record(self.path, time.perf_counter() - toc, error=True)
+                self.send_json(404, {'error': f'Unknown endpoint {self.path}'})
+                return
+        except (ValueError, TypeError, KeyError) as error:
+            self.metrics.record(self.path, time.perf_counter() - toc, error=True)
+            self.send_json(400, {'error': str(error)})
+            return
+        elapsed = time.perf_counter() - toc
+        self.metrics.record(self.path, elapsed)
+        result['elapsed_ms'] = elapsed * 1000
+        self.send_json(200, result)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(host:str=HOST, port:int=PORT):
+    warm_up()
+    server = ThreadingHTTPServer((host, port), SolverHandler)
+    server.daemon_threads = True
+    return server
+
+# Client for the service, for the apps and the notebook
+class SolverClient():
+    def __init__(self, url:str=f'http://{HOST}:{PORT}', timeout:float=30):
+        self.url = url
+        self.timeout = timeout
+
+    def post(self, endpoint:str, body:dict):
+        data = json.dumps(body).encode('utf-8')
+        req = urllib_request.Request(self.url + endpoint, data=data, headers={'Content-Type': 'application/json'})
+        with urllib_request.urlopen(req, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def next_guess(self, history:list, policy:str='entropy'):
+        return self.post('/next_guess', {'policy': policy, 'history': history})
+
+    def solve(self, targets:list, policy:str='entropy', seed=None):
+        return self.post('/solve', {'policy': policy, 'targets': targets, 'seed': seed})['results']
+
+    def metrics(self):
+        with urllib_request.urlopen(self.url + '/metrics', timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the local solver service.')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port)
+    print(f'Solver service listening on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,126 @@
+'''Solver sessions for live games.
+
+play and the Wordle environment compute the feedback from the goal word, which a real puzzle never shows. A session
+only gets what the player sees, the colors of every guess, and suggests the next guess with the same policy code:
+
+    session = SolverSession(make_policy('cluster_2k'))
+    session.suggestion                        # 'CRANE'
+    session.update('CRANE', 'bybbg')          # -> ('...', 12) next suggestion and number of words still possible
+    session.update('SPITE', 'ggggg')          # -> ('SPITE', 1), session.solved is True
+
+Colors are 'g' green, 'y' yellow and 'b' (or 'w', 'x', '-') grey, one per letter. The guess doesn't have to be the
+suggestion, nor a word of the policy's corpus. Every policy gets the colors in its own feedback format
+(get_feedback_from_colors) and filters its candidates as it does in play; the Q-learning policies pick their next
+guess from their Q-table but don't learn from a live game, since the rewards need the goal word.'''
+
+import copy
+import string
+import random
+import argparse
+from models import artifacts, engine, wordle_daily_2k
+
+POLICIES = ('entropy', 'greedy_2k', 'greedy_15k', 'cluster_2k')
+
+# The policies a session can run, cluster_2k is the trained model of the pygame app
+def make_policy(name:str, rng=None):
+    if name == 'entropy':
+        return engine.EntropyPolicy('goal', rng=rng)
+    if name == 'greedy_2k':
+        return engine.GreedyPolicy('occurrence', corpus_kind='goal', rng=rng)
+    if name == 'greedy_15k':
+        return engine.GreedyPolicy('occurrence', corpus_kind='accepted', rng=rng)
+    if name == 'cluster_2k':
+        cluster_results, q_table = artifacts.load_pygame_model(wordle_daily_2k.NUMBER_OF_CLUSTER)
+        return engine.QClusterPolicy(wordle_daily_2k.LEARNING_RATE, wordle_daily_2k.EXPLORATION_RATE,
+                                     wordle_daily_2k.SHRINKAGE_FACTOR, wordle_daily_2k.NUMBER_OF_CLUSTER,
+                                     cluster_results, q_table.copy(), corpus_kind='goal', rng=rng)
+    raise ValueError(f"Unknown policy '{name}', expected one of {POLICIES}")
+
+# Colors of a guess as evalGuess returns them ('g', 'y' or 'w' per letter)
+def parse_colors(colors:str):
+    colors = colors.lower()
+    if len(colors) != 5 or any(colour not in 'gybwx-' for colour in colors):
+        raise ValueError(f"Colors '{colors}' should be 5 letters of g (green), y (yellow) or b (grey)")
+    return ['g' if colour == 'g' else 'y' if colour == 'y' else 'w' for colour in colors]
+
+def parse_word(word:str):
+    word = word.strip().upper()
+    if len(word) != 5 or any(letter not in string.ascii_uppercase for letter in word):
+        raise ValueError(f"'{word}' is not a 5 letter word")
+    return word
+
+class SolverSession():
+    def __init__(self, policy:engine.Policy, initial_word:str='CRANE'):
+        self.policy = policy
+        initial_word = parse_word(initial_word)
+        if initial_word not in policy.corpus.index:
+            raise ValueError(f"'{initial_word}' is not in the {policy.corpus.kind} words the {policy.name} policy "
+                             f"guesses from")
+        # The goal is unknown, the wordle only carries the initial word and state to the policy
+        wordle = engine.Wordle(initial_word, goal_word='', rng=policy.rng)
+        self.game = policy.new_game(wordle)
+        self.state = wordle.get_state()
+        self.suggestion = initial_word
+        self.history = []
+        self.solved = False
+
+    # Number of words still possible
+    def remaining(self):
+        return 1 if self.solved else self.policy.remaining(self.game)
+
+    # Plays a guess with the colors the game showed, returns the next suggestion and the number of words left
+    def update(self, guess:str, colors:str):
+        if self.solved:
+            raise ValueError('The puzzle is already solved')
+        guess, evaluation = parse_word(guess), parse_colors(colors)
+        if engine.checkGuess(evaluation):
+            self.history.append((guess, ''.join(evaluation)))
+            self.solved = True
+            self.suggestion = guess
+            return guess, 1
+
+        # A mistyped color can leave no word possible, the session is then left as it was before the guess
+        game = copy.deepcopy(self.game)
+        self.policy.observe(game, guess, self.policy.get_feedback_from_colors(guess, evaluation))
+        if self.policy.remaining(game) == 0:
+            raise ValueError(f'No word matches every guess and color so far, {guess} {colors} left nothing')
+        self.game = game
+        self.history.append((guess, ''.join(evaluation)))
+
+        # Same state as in play when the suggestion was played, otherwise the state the guess leads to
+        if guess != self.suggestion:
+            state = self.policy.get_state(guess)
+            self.state = state if state is not None else self.state
+        action, word = self.policy.choose(self.game, self.state, len(self.history))
+        self.state = word if action is None else action
+        self.suggestion = word
+        return word, self.policy.remaining(self.game)
+
+# Replays a whole history of (guess, colors) pairs, the last suggestion is the next guess to play
+def solve_history(policy_name:str, history:list, initial_word:str='CRANE', rng=None):
+    session = SolverSession(make_policy(policy_name, rng), initial_word)
+    for guess, colors in history:
+        session.update(guess, colors)
+    return session
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Suggest guesses for a live wordle game.')
+    parser.add_argument('--policy', choices=POLICIES, default='entropy')
+    parser.add_argument('--initial-word', default='CRANE')
+    args = parser.parse_args()
+
+    try:
+        session = SolverSession(make_policy(args.policy, random.Random()), args.initial_word)
+    except ValueError as error:
+        parser.error(str(error))
+    while not session.solved:
+        print(f'Suggested guess: {session.suggestion} ({session.remaining()} words possible)')
+        try:
+            guess, colors = input('Guess and colors (e.g. CRANE bybbg): ').split()
+            session.update(guess, colors)
+        except ValueError as error:
+            print(error)
+        except EOFError:
+            break
+    if session.solved:
+        print(f'Solved in {len(session.history)} guesses')
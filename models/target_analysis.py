@@ -0,0 +1,118 @@
+'''Worst-case target analysis.
+
+The win rate of run_simulations is measured on random targets, so the few words that take 7 guesses or more hardly
+ever come up. Here every goal word is played as the target, split across processes, and the full distribution of
+guess counts comes back with the worst targets:
+
+    python -m models.target_analysis --solver greedy_search_15k
+    python -m models.target_analysis --solver cluster_2k --seeds 20
+
+The greedy, entropy and optimal solvers are deterministic and play every word once, the words split in chunks across
+the processes. The RL models explore at random, so every word is played with several seeds; a seed plays every word
+with one policy, so the cluster models keep learning across the words as they do in run_simulations, and the seeds
+are spread across the processes. Their guesses only depend on the seeds, not on the number of processes. Every
+table the policies use (word scores, feedback table, cluster labels) is built once before the workers are forked, so
+they start with them in memory and a sweep of the deterministic solvers takes seconds.'''
+
+import os
+import time
+import random
+import argparse
+import numpy as np
+from multiprocessing import Pool
+from models import (engine, wordle_base_15k, wordle_cluster_15k, wordle_cluster_2k, wordle_greedy_search_15k,
+                    wordle_greedy_search_2k, wordle_optimal_2k)
+from models.result_cache import EVALUATION_RUNS
+
+DETERMINISTIC_SOLVERS = ('greedy_search_2k', 'greedy_search_15k', 'entropy_2k', 'optimal_2k')
+RL_SOLVERS = ('base_15k', 'cluster_2k', 'cluster_15k')
+SOLVERS = DETERMINISTIC_SOLVERS + RL_SOLVERS
+
+TARGET_RESULTS_PATH = 'evaluation_results/targets_{}.npz'
+
+# Policy of the solver, the RL models with the parameters analysis.ipynb evaluated them with
+def get_policy(solver:str, seed=None):
+    if solver == 'greedy_search_2k':
+        return wordle_greedy_search_2k.get_policy(seed)
+    if solver == 'greedy_search_15k':
+        return wordle_greedy_search_15k.get_policy(seed)
+    if solver == 'entropy_2k':
+        return engine.EntropyPolicy('goal', rng=random.Random(seed))
+    if solver == 'optimal_2k':
+        return wordle_optimal_2k.get_policy(seed=seed)
+    if solver in RL_SOLVERS:
+        _, learning_rate, exploration_rate, shrinkage_factor, num_clusters, _ = next(
+            run for run in EVALUATION_RUNS if run[0] == solver)
+        if solver == 'base_15k':
+            return wordle_base_15k.get_policy(learning_rate, exploration_rate, shrinkage_factor, seed)
+        model = wordle_cluster_2k if solver == 'cluster_2k' else wordle_cluster_15k
+        return model.get_policy(learning_rate, exploration_rate, shrinkage_factor, num_clusters, seed=seed)
+    raise ValueError(f"Unknown solver '{solver}', expected one of {SOLVERS}")
+
+# Guesses taken on each of the words by one policy of the solver, run in the worker processes
+def play_targets(task:tuple):
+    solver, seed, targets = task
+    policy = get_policy(solver, seed)
+    initial_word = getattr(policy, 'first_word', 'CRANE')
+    return np.array([engine.play(policy, target, initial_word)[0] for target in targets], dtype=np.int16)
+
+''' Plays every goal word with the solver, seeds times for the RL models (once for the deterministic ones by
+default). Returns the words, the guesses of every (word, seed), the distribution of the guess counts (distribution[i]
+games took i guesses), the mean guesses, the win rate and the worst targets as (word, most guesses, mean guesses),
+worst first. '''
+
+def analyse_targets(solver:str, seeds:int=None, processes:int=None, worst:int=20):
+    seeds = seeds if seeds is not None else (1 if solver in DETERMINISTIC_SOLVERS else 10)
+    words = np.array(engine.get_corpus('goal').words)
+
+    # Build the shared tables before forking (the first policy does it), so the workers don't each build them
+    get_policy(solver)
+    processes = processes if processes is not None else os.cpu_count()
+    if solver in DETERMINISTIC_SOLVERS:
+        # About 4 tasks per process in all, so the slow words of one chunk don't hold the others up
+        chunks = np.array_split(np.arange(len(words)), max(1, processes * 4 // seeds))
+    else:
+        # A policy learns from the words it played before, so splitting them would change the guesses
+        chunks = [np.arange(len(words))]
+    shares = [(seed, chunk) for seed in range(seeds) for chunk in chunks]
+    toc = time.time()
+    with Pool(processes) as pool:
+        results = pool.map(play_targets, [(solver, seed, words[chunk].tolist()) for seed, chunk in shares])
+    time_taken = time.time() - toc
+
+    guesses = np.zeros((len(words), seeds), dtype=np.int16)
+    for (seed, chunk), steps in zip(shares, results):
+        guesses[chunk, seed] = steps
+    most, mean = guesses.max(axis=1), guesses.mean(axis=1)
+    order = np.lexsort((-mean, -most))[:worst]
+    return {'words': words,
+            'guesses': guesses,
+            'distribution': np.bincount(guesses.ravel()),
+            'average_guesses': float(guesses.mean()),
+            'win_rate': float(np.mean(guesses <= 6) * 100),
+            'worst': [(words[i], int(most[i]), float(mean[i])) for i in order],
+            'time_taken': time_taken}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Play every goal word with a solver and report the worst targets.')
+    parser.add_argument('--solver', choices=SOLVERS, default='greedy_search_2k')
+    parser.add_argument('--seeds', type=int, default=None, help='games per word (1 for deterministic solvers)')
+    parser.add_argument('--processes', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--worst', type=int, default=20, help='number of worst targets to list')
+    parser.add_argument('--save', action='store_true', help=f'save the guesses to {TARGET_RESULTS_PATH}')
+    args = parser.parse_args()
+
+    result = analyse_targets(args.solver, args.seeds, args.processes, args.worst)
+    games = result['guesses'].size
+    print(f"{args.solver}: {games} games in {result['time_taken']:.1f}s, average guesses "
+          f"{result['average_guesses']:.3f}, win rate {result['win_rate']:.2f}%")
+    for count, games_with_count in enumerate(result['distribution']):
+        if games_with_count:
+            print(f'{count:3d} guesses: {games_with_count:6d} ({games_with_count / games * 100:.2f}%)')
+    print('Worst targets:')
+    for word, most, mean in result['worst']:
+        print(f'  {word}: {most} guesses at most, {mean:.2f} on average')
+    if args.save:
+        path = TARGET_RESULTS_PATH.format(args.solver)
+        np.savez_compressed(path, words=result['words'].astype('S5'), guesses=result['guesses'])
+        print(f'Saved to {path}')
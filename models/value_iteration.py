@@ -0,0 +1,165 @@
+'''Model-based value iteration for the cluster model.
+
+run_simulation_pygame learns the 9 x 9 cluster Q-table from 100000 simulated games, each update seeing a single noisy
+reward. The reward of a guess is fully determined by the (word, goal) pairs though (eval.get_score and
+eval.get_reward), so the expected rewards can be computed from the scores of every pair instead, and the Q-table
+solved for directly:
+
+    python -m models.value_iteration --clusters 9 --shrinkage-factor 0.9
+
+The model follows the game of QClusterPolicy one guess deep. From a current word w (state: its cluster) and a goal
+g, the candidates are the goal words with the same get_pattern against w as g, without w itself. Picking cluster a
+(action) plays a uniformly random candidate w' of a, which earns get_reward(score(w, g), score(w', g)) as
+make_action does, leads to state a and ends the game if w' is g. Averaging over every current word of the state,
+every goal and every candidate gives the expected reward and the probability of ending of every (state, action).
+
+The Q-table is the fixed point of the learner itself, so it can stand in for models/Q_table.npy. QClusterPolicy.learn
+moves Q(s, a) by alpha * (reward + shrinkage_factor * max Q(a, .) - 2 Q(s, a)), which settles at
+
+    Q(s, a) = (reward(s, a) + shrinkage_factor * max Q(a, .)) / 2
+
+The learner never cuts the future off when the game ends, and the max runs over the whole row, including the pairs
+that are never played and keep their initial 0. Those pairs are 0 here too (done is only reported).
+
+The candidates of later guesses are also filtered by the guesses before, which the one-guess model leaves out. The
+result has the shape and meaning of models/Q_table.npy and is saved next to it, after both tables played every goal
+word with the pygame model's hyper-parameters so they can be compared.'''
+
+import time
+import random
+import argparse
+import numpy as np
+from models import artifacts, engine
+
+Q_TABLE_PLANNED_PATH = 'models/Q_table_planned.npy'
+SCORES = ('green', 'yellow', 'black')
+
+# eval.get_score of every (word, goal) pair as green, yellow and black counts, and the get_pattern code of the pair
+# (position i weighted by 3**i, 'b' 0, 'y' 1, 'g' 2)
+def get_pair_scores(corpus_kind:str='goal'):
+    corpus = engine.get_corpus(corpus_kind)
+    letters = corpus.letters
+    n = len(letters)
+    scores = {name: np.zeros((n, n), dtype=np.int8) for name in SCORES}
+    patterns = np.zeros((n, n), dtype=np.uint8)
+    for i in range(5):
+        green = letters[:, None, i] == letters[None, :, i]
+        in_goal = ((corpus.letter_masks[None, :] >> letters[:, None, i]) & 1).astype(bool)
+        yellow = in_goal & ~green
+        scores['green'] += green
+        scores['yellow'] += yellow
+        scores['black'] += ~in_goal
+        patterns += (2 * green + yellow).astype(np.uint8) * np.uint8(3**i)
+    return scores, patterns
+
+''' Expected reward and probability of ending the game of every (state, action) pair of clusters. For every current
+word, the candidates are counted per (pattern, cluster, position, letter) with bincount. The score sums of a
+goal against every candidate of its pattern in a cluster then follow from those counts (green: the candidates with
+the goal's letter at each position, black: the positions whose letter is not in the goal), so no (candidate, goal)
+pair is ever enumerated and the whole model is a loop over the current words. Pairs of clusters that can never be
+played are nan. '''
+
+def get_cluster_model(cluster_assignment:np.ndarray, corpus_kind:str='goal'):
+    corpus = engine.get_corpus(corpus_kind)
+    scores, patterns = get_pair_scores(corpus_kind)
+    cluster_assignment = np.asarray(cluster_assignment)
+    letters = corpus.letters.astype(np.int64)
+    n = len(patterns)
+    k = int(cluster_assignment.max()) + 1
+    goal_is_action = cluster_assignment[:, None] == np.arange(k)[None, :]
+    # A letter repeated in the goal only counts once for being in the goal
+    first_letters = np.array([[word[i] not in word[:i] for i in range(5)] for word in corpus.words])
+    positions = np.arange(5)
+    # Flat offsets of (goal, action, position) into the per-pattern count tables, the goal's letter at the position
+    green_offsets = (np.arange(k)[None, :, None] * 5 + positions) * 26 + letters[:, None, :]
+    letter_offsets = np.arange(k)[None, :, None] * 26 + letters[:, None, :]
+    reward_sum = np.zeros((k, k))
+    done_sum = np.zeros((k, k))
+    pair_count = np.zeros((k, k))
+
+    for word in range(n):
+        pattern = patterns[word].astype(np.int64)
+        key = pattern * k + cluster_assignment
+        group_counts = np.bincount(key, minlength=243*k).reshape(243, k)[pattern]
+        position_counts = np.bincount(((key[:, None] * 5 + positions) * 26 + letters).ravel(), minlength=243*k*5*26)
+        letter_counts = np.bincount((key[:, None] * 26 + letters).ravel(), minlength=243*k*26)
+        # Green and in-goal letters of the candidates of each goal's pattern per cluster, against the goal
+        # (the current word itself only shares its pattern with itself as the goal, which is left out)
+        green = position_counts.take(green_offsets + (pattern * (k*5*26))[:, None, None]).sum(axis=2)
+        in_goal = (letter_counts.take(letter_offsets + (pattern * (k*26))[:, None, None])
+                   * first_letters[:, None, :]).sum(axis=2)
+        playable = group_counts > 0
+        playable[word] = False
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_scores = {'green': green / group_counts,
+                           'yellow': (in_goal - green) / group_counts,
+                           'black': 5 - in_goal / group_counts}
+            rewards = engine.eval.get_reward({name: scores[name][word][:, None] for name in SCORES}, mean_scores)
+            done = goal_is_action / group_counts
+
+        state = cluster_assignment[word]
+        reward_sum[state] += np.where(playable, rewards, 0).sum(axis=0)
+        done_sum[state] += np.where(playable, done, 0).sum(axis=0)
+        pair_count[state] += playable.sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return reward_sum / pair_count, done_sum / pair_count
+
+# Solves the Q-table of the cluster model at the fixed point of QClusterPolicy.learn, the pairs that can never be
+# played keep the learner's initial 0
+def value_iteration(rewards:np.ndarray, shrinkage_factor:float, tolerance:float=1e-9, max_iterations:int=10000):
+    playable = ~np.isnan(rewards)
+    rewards = np.where(playable, rewards, 0)
+    q_table = np.zeros(rewards.shape)
+    for iteration in range(max_iterations):
+        new_q_table = np.where(playable, (rewards + shrinkage_factor * q_table.max(axis=1)[None, :]) / 2, 0)
+        converged = np.max(np.abs(new_q_table - q_table)) < tolerance
+        q_table = new_q_table
+        if converged:
+            break
+    return q_table
+
+# Q-table of the cluster model for the given cluster labels of the goal words, no games played
+def plan_q_table(cluster_assignment:np.ndarray, shrinkage_factor:float=0.9, corpus_kind:str='goal'):
+    rewards, _ = get_cluster_model(cluster_assignment, corpus_kind)
+    return value_iteration(rewards, shrinkage_factor)
+
+# Average guesses and win rate of the cluster model playing every goal word once with each Q-table, each game
+# learning on its own copy of the table like the pygame app
+def compare_q_tables(q_tables:dict, cluster_assignment:np.ndarray, seed:int=0):
+    words = engine.get_corpus('goal').words
+    number_of_cluster = len(next(iter(q_tables.values())))
+    results = {}
+    for name, q_table in q_tables.items():
+        rng = random.Random(seed)
+        steps = np.array([engine.play(engine.QClusterPolicy(
+            artifacts.PYGAME_HYPERPARAMETERS['learning_rate'], artifacts.PYGAME_HYPERPARAMETERS['exploration_rate'],
+            artifacts.PYGAME_HYPERPARAMETERS['shrinkage_factor'], number_of_cluster, cluster_assignment,
+            np.array(q_table), corpus_kind='goal', rng=rng), goal_word=word)[0] for word in words])
+        results[name] = (steps.mean(), np.mean(steps <= 6) * 100)
+    return results
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve the cluster Q-table by value iteration, without simulations.')
+    parser.add_argument('--clusters', type=int, default=9, help='number of clusters of the goal words')
+    parser.add_argument('--shrinkage-factor', type=float, default=0.9)
+    parser.add_argument('--output', default=Q_TABLE_PLANNED_PATH, help='Q-table file to write')
+    args = parser.parse_args()
+
+    toc = time.time()
+    # The labels of the pygame model for its 9 clusters, a fresh clustering otherwise
+    if args.clusters == 9:
+        cluster_assignment, _ = artifacts.load_pygame_model(9)
+    else:
+        cluster_assignment = engine.get_cluster_assignment('goal', args.clusters)
+    q_table = plan_q_table(cluster_assignment, args.shrinkage_factor)
+    print(f'Solved the {args.clusters} x {args.clusters} Q-table in {time.time() - toc:.1f}s')
+
+    q_tables = {'planned': q_table}
+    if args.clusters == 9:
+        q_tables['trained'] = artifacts.load_pygame_model(9)[1]
+    for name, (average_guesses, win_rate) in compare_q_tables(q_tables, cluster_assignment).items():
+        print(f'{name}: {average_guesses:.3f} guesses on average over the goal words, win rate {win_rate:.2f}%')
+    np.save(args.output, q_table)
+    print(f'Saved to {args.output}')
@@ -0,0 +1,130 @@
+'''Compiled vocabulary shared by every model.
+
+Instead of every module reading models/accepted_words.txt and models/goal_words.txt line by line and upper-casing
+each word, the two lists are compiled once into a single structured numpy array saved to models/vocabulary.npy.
+Each row is one accepted word (in the sorted order of accepted_words.txt) with:
+
+    word        - the word itself as fixed-width 5 byte upper-case ascii (S5)
+    accepted    - True for every word that can be guessed
+    goal        - True if the word is one of the 2309 goal words
+    goal_rank   - position of the word in goal_words.txt (the daily order), -1 if not a goal word
+    letter_mask - 26 bit mask of the letters in the word, bit 0 being 'A'
+
+The row number is the word ID, so every solver that loads the vocabulary from here agrees on the same integer IDs.
+The file is loaded with a single memory-mapped read and recompiled automatically if either text file changed. The
+paths and sha1 of the two text files it was compiled from are kept next to it in models/vocabulary.json (a .npy has
+no room for them and a .npz can't be memory-mapped), so a checkout that only touches the files' mtimes doesn't
+rewrite it. A vocabulary compiled to another output_path gets its own .json beside it.'''
+
+import os
+import json
+import hashlib
+import numpy as np
+from functools import lru_cache
+
+ACCEPTED_WORDS_PATH = 'models/accepted_words.txt'
+GOAL_WORDS_PATH = 'models/goal_words.txt'
+VOCABULARY_PATH = 'models/vocabulary.npy'
+
+VOCABULARY_DTYPE = np.dtype([('word', 'S5'),
+                             ('accepted', '?'),
+                             ('goal', '?'),
+                             ('goal_rank', '<i2'),
+                             ('letter_mask', '<u4')])
+
+# Read a word list text file into a list of upper-case words
+def read_word_list(path:str):
+    with open(path, 'r') as file:
+        return [word.strip().upper() for word in file if word.strip()]
+
+# Compile the two text word lists into the structured vocabulary array and save it
+def compile_vocabulary(accepted_path:str=ACCEPTED_WORDS_PATH,
+                       goal_path:str=GOAL_WORDS_PATH,
+                       output_path:str=VOCABULARY_PATH):
+    accepted_words = read_word_list(accepted_path)
+    goal_words = read_word_list(goal_path)
+
+    # Goal words are always valid guesses, keep any missing ones at the end so the accepted order is untouched
+    accepted_set = set(accepted_words)
+    all_words = accepted_words + [word for word in goal_words if word not in accepted_set]
+    goal_rank = {word: rank for rank, word in enumerate(goal_words)}
+
+    vocabulary = np.zeros(len(all_words), dtype=VOCABULARY_DTYPE)
+    vocabulary['word'] = all_words
+    vocabulary['accepted'] = True
+    vocabulary['goal_rank'] = [goal_rank.get(word, -1) for word in all_words]
+    vocabulary['goal'] = vocabulary['goal_rank'] >= 0
+
+    letters = get_letters(vocabulary)
+    vocabulary['letter_mask'] = np.bitwise_or.reduce(np.left_shift(1, letters, dtype=np.uint32), axis=1)
+
+    np.save(output_path, vocabulary)
+    with open(get_hash_path(output_path), 'w') as file:
+        json.dump({'accepted_path': accepted_path, 'goal_path': goal_path,
+                   'source_hash': get_source_hash(accepted_path, goal_path)}, file)
+    return vocabulary
+
+# Path of the .json holding the sources of a compiled vocabulary, beside it (models/vocabulary.json by default)
+def get_hash_path(output_path:str=VOCABULARY_PATH):
+    return os.path.splitext(output_path)[0] + '.json'
+
+# sha1 of the two text word lists, the sources of the compiled vocabulary
+def get_source_hash(accepted_path:str=ACCEPTED_WORDS_PATH, goal_path:str=GOAL_WORDS_PATH):
+    sha1 = hashlib.sha1()
+    for path in (accepted_path, goal_path):
+        with open(path, 'rb') as file:
+            sha1.update(file.read())
+    return sha1.hexdigest()
+
+# True if the compiled vocabulary is missing or was compiled from other word lists than the given ones
+def is_stale(output_path:str=VOCABULARY_PATH, accepted_path:str=ACCEPTED_WORDS_PATH, goal_path:str=GOAL_WORDS_PATH):
+    hash_path = get_hash_path(output_path)
+    if not os.path.exists(output_path) or not os.path.exists(hash_path):
+        return True
+    with open(hash_path) as file:
+        sources = json.load(file)
+    return (sources.get('accepted_path', ACCEPTED_WORDS_PATH) != accepted_path
+            or sources.get('goal_path', GOAL_WORDS_PATH) != goal_path
+            or sources.get('source_hash') != get_source_hash(accepted_path, goal_path))
+
+# Load the compiled vocabulary, memory-mapped and shared by every caller in the process
+@lru_cache(maxsize=None)
+def load_vocabulary():
+    if is_stale():
+        compile_vocabulary()
+    return np.load(VOCABULARY_PATH, mmap_mode='r')
+
+# Word IDs of either the 'accepted' words (sorted) or the 'goal' words (in the daily order of goal_words.txt)
+@lru_cache(maxsize=None)
+def get_word_ids(kind:str='accepted'):
+    vocabulary = load_vocabulary()
+    if kind == 'accepted':
+        ids = np.flatnonzero(vocabulary['accepted'])
+    elif kind == 'goal':
+        ids = np.flatnonzero(vocabulary['goal'])
+        ids = ids[np.argsort(vocabulary['goal_rank'][ids])]
+    else:
+        raise ValueError(f"Unknown word list '{kind}', expected 'accepted' or 'goal'")
+    ids.flags.writeable = False
+    return ids
+
+# Upper-case word strings for the given list, in word ID order for 'accepted' and daily order for 'goal'
+@lru_cache(maxsize=None)
+def get_words(kind:str='accepted'):
+    vocabulary = load_vocabulary()
+    return tuple(word.decode('ascii') for word in vocabulary['word'][get_word_ids(kind)])
+
+# Short fingerprint of a word list, stored with anything built from it (cluster labels, Q-tables) to detect when
+# the word list has changed underneath it
+@lru_cache(maxsize=None)
+def get_words_hash(kind:str='accepted'):
+    return hashlib.sha1('\n'.join(get_words(kind)).encode('ascii')).hexdigest()
+
+# (n, 5) uint8 array of letter indexes (A=0 ... Z=25) for the given vocabulary rows
+def get_letters(vocabulary:np.ndarray):
+    words = np.ascontiguousarray(vocabulary['word'])
+    return np.frombuffer(words.tobytes(), dtype=np.uint8).reshape(-1, 5) - ord('A')
+
+if __name__ == '__main__':
+    vocabulary = compile_vocabulary()
+    print(f'Compiled {len(vocabulary)} words ({vocabulary["goal"].sum()} goal words) to {VOCABULARY_PATH}')
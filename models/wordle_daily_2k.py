@@ -0,0 +1,107 @@
+'''Daily word batch solve for the pygame model.
+
+The pygame solver only ever plays today's word. This module plays the same production policy (the 2k cluster model
+with the trained Q-table of the models/pygame_model/ bundle) on every daily word in a date range, split across
+processes, and writes the guesses of every day to a compact results file:
+
+    python -m models.wordle_daily_2k --start 2022-06-25 --end 2022-12-31
+
+The results file (evaluation_results/daily_results.npz by default) holds
+
+    dates   - datetime64[D] date of every solved day
+    words   - the daily word of that day (S5)
+    counts  - number of guesses taken
+    paths   - every guess of every day, flattened (S5)
+    offsets - day i guessed paths[offsets[i]:offsets[i+1]]
+
+Each day is played with its own seeded random generator, so two runs with the same seed give the same file and can
+be compared as a regression check.'''
+
+import random
+import argparse
+import numpy as np
+from datetime import date, timedelta
+from multiprocessing import Pool
+from models import artifacts, engine
+
+# The trained model: 9 clusters of the goal words, matching the 9 x 9 Q-table from run_simulation_pygame
+LEARNING_RATE = 0.001
+EXPLORATION_RATE = 0.9
+SHRINKAGE_FACTOR = 0.9
+NUMBER_OF_CLUSTER = 9
+
+# The goal words are in daily order, BEADY being the word of 2022-06-25
+REFERENCE_WORD = 'BEADY'
+REFERENCE_DATE = date(2022, 6, 25)
+
+DAILY_RESULTS_PATH = 'evaluation_results/daily_results.npz'
+
+# First and last day covered by the goal word list
+def get_schedule():
+    words = engine.get_corpus('goal').words
+    first_day = REFERENCE_DATE - timedelta(days=words.index(REFERENCE_WORD))
+    return first_day, first_day + timedelta(days=len(words) - 1)
+
+# Upper-case daily word of the given day
+def get_daily_word(day:date):
+    first_day, last_day = get_schedule()
+    if not first_day <= day <= last_day:
+        raise ValueError(f'No daily word for {day}, the goal words cover {first_day} to {last_day}')
+    return engine.get_corpus('goal').words[(day - first_day).days]
+
+# Plays the production policy once on the given word, learning on a copy of the trained Q-table like the app does
+def solve(goal_word:str,
+          learning_rate:float=LEARNING_RATE,
+          exploration_rate:float=EXPLORATION_RATE,
+          shrinkage_factor:float=SHRINKAGE_FACTOR,
+          number_of_cluster:int=NUMBER_OF_CLUSTER,
+          rng=None):
+    cluster_results, q_table = artifacts.load_pygame_model(number_of_cluster)
+    policy = engine.QClusterPolicy(learning_rate, exploration_rate, shrinkage_factor, number_of_cluster,
+                                   cluster_results, q_table.copy(), corpus_kind='goal', rng=rng)
+    return engine.play(policy, goal_word=goal_word)
+
+# Solves one day with its own generator, run in the worker processes
+def solve_day(day_and_seed:tuple):
+    day, seed = day_and_seed
+    steps, visited_words = solve(get_daily_word(day), rng=random.Random(seed * 1000003 + day.toordinal()))
+    return steps, visited_words
+
+# Solves every daily word from start to end (both included) in parallel and saves the results file
+def run_daily_batch(start:date=None, end:date=None, processes:int=None, seed:int=0,
+                    output_path:str=DAILY_RESULTS_PATH):
+    first_day, last_day = get_schedule()
+    start = start if start is not None else first_day
+    end = end if end is not None else min(date.today(), last_day)
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    for day in (start, end):
+        get_daily_word(day)
+
+    # Load the artifact once before forking so every worker starts with the labels and Q-table in memory
+    artifacts.load_pygame_model(NUMBER_OF_CLUSTER)
+    with Pool(processes) as pool:
+        results = pool.map(solve_day, [(day, seed) for day in days], chunksize=max(1, len(days) // 64))
+
+    counts = np.array([steps for steps, _ in results], dtype=np.int16)
+    offsets = np.zeros(len(days) + 1, dtype=np.int32)
+    offsets[1:] = np.cumsum([len(visited_words) for _, visited_words in results])
+    np.savez_compressed(output_path,
+                        dates=np.array(days, dtype='datetime64[D]'),
+                        words=np.array([get_daily_word(day) for day in days], dtype='S5'),
+                        counts=counts,
+                        paths=np.array([word for _, visited_words in results for word in visited_words], dtype='S5'),
+                        offsets=offsets)
+    return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve every daily word in a date range with the pygame model.')
+    parser.add_argument('--start', type=date.fromisoformat, default=None, help='first day (YYYY-MM-DD)')
+    parser.add_argument('--end', type=date.fromisoformat, default=None, help='last day (YYYY-MM-DD), today by default')
+    parser.add_argument('--processes', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the per-day random generators')
+    parser.add_argument('--output', default=DAILY_RESULTS_PATH, help='results file to write')
+    args = parser.parse_args()
+
+    counts = run_daily_batch(args.start, args.end, args.processes, args.seed, args.output)
+    print(f'Solved {len(counts)} days: average guesses {counts.mean():.3f}, '
+          f'win rate {np.mean(counts <= 6) * 100:.2f}%, saved to {args.output}')
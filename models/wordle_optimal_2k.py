@@ -0,0 +1,255 @@
+'''Exact optimal policy for the 2309 goal words.
+
+Every other model is a heuristic. Guessing from the goal words (as wordle_greedy_search_2k does), the policy with
+the minimum expected number of guesses can be found exactly by a memoized search over the candidate partitions:
+
+    cost(S) = |S| + min over guesses g of  sum of cost(S') over the feedback groups S' of g on S, but ggggg
+
+where cost(S) is the total number of guesses to solve every word of the candidate set S (cost of one word is 1).
+The search is a branch and bound:
+
+    - partitions come from the shared goal x goal feedback table (engine.get_feedback_table), the feedback of
+      every guess on S is one gather and the number of groups of every guess one sort
+    - a guess can't do better than |S| + sum over its groups of (2|S'| - 1), minus 1 if it is in S. Guesses are
+      tried from the lowest bound and the search stops once no bound beats the best cost found
+    - a group gets the budget left by the groups solved so far and the bounds of the others, and a search that
+      can't meet its budget gives up early (its result is then only a lower bound)
+    - exact costs and the lower bounds of failed searches are kept in a transposition cache keyed on S
+
+Solving the tree below a first word takes seconds to a minute, spread over processes by first-level group, and
+every process reports the nodes it expanded. The first words tried are the ones with the lowest bound (or the given
+ones), the best of them is kept and the result is exact for its first word; --top 2309 tries every first word for
+the exact optimum (hours). The policy is saved to models/optimal_policy_2k.npz as the guesses of every goal word
+(the same layout as wordle_daily_2k's results):
+
+    python -m models.wordle_optimal_2k --first-word TRACE --processes 8
+    python -m models.wordle_optimal_2k --top 10
+
+The saved policy starts with SLATE, the best of the top 10 first words, at 3.4435 guesses on average (7951 guesses
+over the 2309 goal words) and never more than 6.
+
+OptimalPolicy plays the saved policy through the engine like the other models.'''
+
+import time
+import random
+import argparse
+import numpy as np
+from multiprocessing import Pool
+from models import engine, vocabulary
+
+OPTIMAL_POLICY_PATH = 'models/optimal_policy_2k.npz'
+SOLVED = 242 # feedback code of ggggg
+
+''' Branch and bound search over one corpus. Candidate sets are sorted int16 arrays of corpus positions. '''
+
+class OptimalSearch():
+    def __init__(self, corpus_kind:str='goal'):
+        self.corpus_kind = corpus_kind
+        self.table = engine.get_feedback_table(corpus_kind, corpus_kind)
+        self.exact = {} # candidates -> (cost, best guess)
+        self.lower = {} # candidates -> lower bound from a search that ran out of budget
+        self.nodes = 0
+
+    # Groups of the candidates by the feedback of the guess, largest first, without the ggggg group
+    def get_groups(self, candidates:np.ndarray, guess:int):
+        feedback = self.table[guess, candidates]
+        order = np.argsort(feedback, kind='stable')
+        codes = feedback[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        groups = [candidates[order[start:end]] for start, end, code in zip(starts, np.r_[starts[1:], len(codes)],
+                                                                          codes[starts]) if code != SOLVED]
+        return sorted(groups, key=len, reverse=True)
+
+    # Exact cost of the candidates if it is below budget, otherwise a lower bound that is at least the budget
+    def solve(self, candidates:np.ndarray, budget:float=np.inf):
+        n = len(candidates)
+        if n == 1:
+            return 1
+        if n == 2:
+            return 3
+        key = candidates.tobytes()
+        if key in self.exact:
+            return self.exact[key][0]
+        if self.lower.get(key, 0) >= budget:
+            return self.lower[key]
+        self.nodes += 1
+
+        feedback = np.sort(self.table[:, candidates], axis=1)
+        num_groups = 1 + np.count_nonzero(feedback[:, 1:] != feedback[:, :-1], axis=1)
+        in_candidates = np.zeros(len(feedback), dtype=bool)
+        in_candidates[candidates] = True
+        # Every group of size m needs at least 2m - 1 more guesses, the guess's own group (ggggg) none
+        bounds = 3*n - in_candidates - num_groups
+        useful = (num_groups > 1) | in_candidates
+        guesses = np.flatnonzero(useful)
+        guesses = guesses[np.lexsort((~in_candidates[guesses], bounds[guesses]))]
+
+        best_cost, best_guess = np.inf, None
+        for guess in guesses:
+            bound = bounds[guess]
+            if bound >= min(best_cost, budget):
+                break
+            groups = self.get_groups(candidates, guess)
+            remaining = bound - n
+            cost = n
+            for group in groups:
+                remaining -= 2*len(group) - 1
+                cost += self.solve(group, min(best_cost, budget) - cost - remaining)
+                if cost + remaining >= min(best_cost, budget):
+                    break
+            else:
+                best_cost, best_guess = cost, int(guess)
+
+        if best_guess is None:
+            # Nothing met the budget: the lowest bound left (or the budget itself) is a lower bound on the cost
+            lower = max(budget, self.lower.get(key, 0))
+            self.lower[key] = lower
+            return lower
+        self.exact[key] = (best_cost, best_guess)
+        return best_cost
+
+    # Guesses of every word of the candidates, following the best guesses of an exact solve
+    def get_paths(self, candidates:np.ndarray, prefix:tuple=()):
+        words = engine.get_corpus(self.corpus_kind).words
+        if len(candidates) <= 2:
+            guess = int(candidates[0])
+        else:
+            self.solve(candidates)
+            guess = self.exact[candidates.tobytes()][1]
+        paths = {}
+        if guess in candidates:
+            paths[words[guess]] = prefix + (words[guess],)
+        for group in self.get_groups(candidates, guess):
+            paths.update(self.get_paths(group, prefix + (words[guess],)))
+        return paths
+
+# Solves one first-level group in a worker process
+def solve_group(args:tuple):
+    corpus_kind, group, first_word = args
+    toc = time.time()
+    search = OptimalSearch(corpus_kind)
+    cost = search.solve(group)
+    paths = search.get_paths(group, (first_word,))
+    return cost, paths, search.nodes, time.time() - toc
+
+''' Optimal tree below a first word. The first-level groups are solved in parallel, largest first. Returns the total
+cost (guesses summed over the goal words, the first word included), the guesses of every goal word and the search
+statistics. '''
+
+def solve_first_word(first_word:str, corpus_kind:str='goal', processes:int=None):
+    corpus = engine.get_corpus(corpus_kind)
+    search = OptimalSearch(corpus_kind)
+    candidates = np.arange(len(corpus), dtype=np.int16)
+    first_guess = corpus.index[first_word]
+    groups = search.get_groups(candidates, first_guess)
+
+    toc = time.time()
+    cost = len(candidates)
+    paths = {first_word: (first_word,)}
+    nodes = 0
+    with Pool(processes) as pool:
+        for group_cost, group_paths, group_nodes, _ in pool.imap_unordered(
+                solve_group, [(corpus_kind, group, first_word) for group in groups]):
+            cost += group_cost
+            paths.update(group_paths)
+            nodes += group_nodes
+    seconds = time.time() - toc
+    return cost, paths, {'nodes': nodes, 'seconds': seconds, 'nodes_per_second': nodes / max(seconds, 1e-9)}
+
+# First words of the corpus with the lowest bound on their cost, the most promising ones to solve exactly
+def get_first_word_candidates(top:int=5, corpus_kind:str='goal'):
+    corpus = engine.get_corpus(corpus_kind)
+    search = OptimalSearch(corpus_kind)
+    feedback = np.sort(search.table, axis=1)
+    num_groups = 1 + np.count_nonzero(feedback[:, 1:] != feedback[:, :-1], axis=1)
+    order = np.argsort(-num_groups, kind='stable')
+    return [corpus.words[guess] for guess in order[:top]]
+
+def save_policy(paths:dict, output_path:str=OPTIMAL_POLICY_PATH, corpus_kind:str='goal'):
+    words = engine.get_corpus(corpus_kind).words
+    counts = np.array([len(paths[word]) for word in words], dtype=np.int16)
+    offsets = np.zeros(len(words) + 1, dtype=np.int32)
+    offsets[1:] = np.cumsum(counts)
+    np.savez_compressed(output_path,
+                        words=np.array(words, dtype='S5'),
+                        counts=counts,
+                        paths=np.array([guess for word in words for guess in paths[word]], dtype='S5'),
+                        offsets=offsets,
+                        words_hash=vocabulary.get_words_hash(corpus_kind))
+
+# Next guess for every feedback history (tuple of feedback codes), and the first word, from the saved policy
+def load_policy(path:str=OPTIMAL_POLICY_PATH, corpus_kind:str='goal'):
+    with np.load(path) as artifact:
+        if str(artifact['words_hash']) != vocabulary.get_words_hash(corpus_kind):
+            raise ValueError(f'{path} was solved for another word list, solve it again')
+        words = [word.decode('ascii') for word in artifact['words']]
+        paths = [[guess.decode('ascii') for guess in artifact['paths'][start:end]]
+                 for start, end in zip(artifact['offsets'][:-1], artifact['offsets'][1:])]
+    table = engine.get_feedback_table(corpus_kind, corpus_kind)
+    index = engine.get_corpus(corpus_kind).index
+    tree = {}
+    for goal, path in zip(words, paths):
+        feedbacks = ()
+        for guess, next_guess in zip(path, path[1:]):
+            feedbacks += (int(table[index[guess], index[goal]]),)
+            tree[feedbacks] = next_guess
+    return paths[0][0], tree
+
+''' The saved optimal policy as an engine policy. Like EntropyPolicy the feedback is the code of the feedback
+table, the candidates are only filtered to report how many words are left. '''
+
+class OptimalPolicy(engine.EntropyPolicy):
+    name = 'Optimal'
+
+    def __init__(self, first_word:str, tree:dict, rng=None):
+        super().__init__('goal', rng)
+        self.first_word = first_word
+        self.tree = tree
+
+    def new_game(self, wordle:engine.Wordle):
+        if wordle is not None and wordle.get_curr_word() != self.first_word:
+            raise ValueError(f'The optimal policy starts with {self.first_word}, not {wordle.get_curr_word()}')
+        game = super().new_game(wordle)
+        game.feedbacks = ()
+        return game
+
+    def observe(self, game:engine.Game, guess:str, feedback:int):
+        super().observe(game, guess, feedback)
+        game.feedbacks += (feedback,)
+
+    def choose(self, game:engine.Game, state, steps:int):
+        return None, self.tree[game.feedbacks]
+
+def get_policy(path:str=OPTIMAL_POLICY_PATH, seed=None):
+    first_word, tree = load_policy(path)
+    return OptimalPolicy(first_word, tree, rng=random.Random(seed))
+
+# Streaming variant of run_simulations, yields one record per game (see engine.iter_simulations)
+def iter_simulations(num_simulations:int=None, seed=None):
+    policy = get_policy(seed=seed)
+    return engine.iter_simulations(policy, num_simulations, initial_word=policy.first_word)
+
+def run_simulations(num_simulations:int, progress=None, cancel=None, seed=None, store=None):
+    policy = get_policy(seed=seed)
+    writer = store.writer('optimal_2k', seed=seed) if store else None
+    return engine.run_simulations(policy, num_simulations, progress, cancel, writer, initial_word=policy.first_word)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve the optimal policy for the 2309 goal words.')
+    parser.add_argument('--first-word', action='append', default=None, help='first word to solve below (repeatable)')
+    parser.add_argument('--top', type=int, default=1, help='number of first words to try if none are given')
+    parser.add_argument('--processes', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--output', default=OPTIMAL_POLICY_PATH, help='policy file to write')
+    args = parser.parse_args()
+
+    first_words = [word.upper() for word in args.first_word] if args.first_word else get_first_word_candidates(args.top)
+    best_cost, best_paths, best_first_word = np.inf, None, None
+    for first_word in first_words:
+        cost, paths, stats = solve_first_word(first_word, processes=args.processes)
+        counts = np.array([len(path) for path in paths.values()])
+        print(f'{first_word}: {cost / len(counts):.4f} guesses on average, {np.sum(counts > 6)} over 6 guesses, '
+              f'{stats["nodes"]} nodes in {stats["seconds"]:.1f}s ({stats["nodes_per_second"]:.0f} nodes/s)')
+        if cost < best_cost:
+            best_cost, best_paths, best_first_word = cost, paths, first_word
+    save_policy(best_paths, args.output)
+    print(f'Saved the policy starting with {best_first_word} to {args.output}')
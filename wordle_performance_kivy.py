@@ -12,12 +12,18 @@ from kivy.uix.gridlayout import GridLayout
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.slider import Slider
 from kivy.uix.popup import Popup
+from kivy.uix.progressbar import ProgressBar
+from kivy.clock import Clock
 from kivy.metrics import *
 from models.wordle_base_15k import run_simulations as rl_base
 from models.wordle_cluster_2k import run_simulations as rl_cluster_1
 from models.wordle_cluster_15k import run_simulations as rl_cluster_2
 from models.wordle_greedy_search_2k import run_simulations as rl_greedy_1
 from models.wordle_greedy_search_15k import run_simulations as rl_greedy_2
+from models.result_cache import get_result_cache
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import matplotlib.pyplot as plt
 from GUI_files.complexRadar import ComplexRadar # Code taken online
@@ -44,6 +50,19 @@ class MainApp(App):
             5 : "Greedy Search 15k"
         }
         self.max_time = 0
+        # simulations run on a background thread so the UI stays responsive, one run at a time
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.cancel_event = None
+        # finished runs are looked up here before running anything
+        self.result_cache = get_result_cache()
+        self.build_figures()
+        self.model_names = {
+            1 : "base_15k",
+            2 : "cluster_2k",
+            3 : "cluster_15k",
+            4 : "greedy_search_2k",
+            5 : "greedy_search_15k"
+        }
         # best parameters from grid search
         # [learning_rate, exploration_rate, shrinkage_factor, num_clusters]
         self.best_params = {
@@ -225,89 +244,188 @@ class MainApp(App):
         self.num_sims_text.text = f"num sims : {round(value)}"  
         self.num_sims = value
 
+    def run_model(self, state, learning_rate, exploration_rate, shrinkage_factor, num_clusters, num_sims, progress, cancel):
+        # runs on the executor thread, so it only gets copies of the slider values and never touches widgets
+        if state == 1:
+            return rl_base(learning_rate,exploration_rate,shrinkage_factor,num_sims,progress=progress,cancel=cancel)
+        elif state == 2:
+            return rl_cluster_1(learning_rate,exploration_rate,shrinkage_factor,num_sims,num_clusters,progress=progress,cancel=cancel)
+        elif state == 3:
+            return rl_cluster_2(learning_rate,exploration_rate,shrinkage_factor,num_sims,num_clusters,progress=progress,cancel=cancel)
+        elif state == 4:
+            return rl_greedy_1(num_sims,progress=progress,cancel=cancel)
+        elif state == 5:
+            return rl_greedy_2(num_sims,progress=progress,cancel=cancel)
+
     def generate_graph(self,instance):
 
-        categories = ['Time Taken', 'Average guesses', 'Win Rate']
-        current_model = None
         popup_content = BoxLayout(orientation = "vertical")
+        button_row = BoxLayout(orientation = "horizontal", size_hint=(1,0.2))
 
         if self.state == 0:
             warning_text = Label(text="No models selected")
             popup_content.add_widget(warning_text)
 
         else:
-            # graphs
-            popup_content.clear_widgets()
-            if self.state == 1:
-                current_model = "RL Base"
-                time_taken, average_guesses, win_rate,guesses = rl_base(self.learning_rate,self.exploration_rate,self.shrinkage_factor,self.num_sims)
-                epochs = np.arange(self.num_sims)
-            elif self.state == 2:
-                current_model = "RL Cluster 2k"
-                time_taken, average_guesses, win_rate,guesses = rl_cluster_1(self.learning_rate,self.exploration_rate,self.shrinkage_factor,self.num_sims,self.num_clusters)
-                epochs = np.arange(self.num_sims)
-            elif self.state == 3:
-                current_model = "RL Cluster 15k"
-                time_taken, average_guesses, win_rate,guesses = rl_cluster_2(self.learning_rate,self.exploration_rate,self.shrinkage_factor,self.num_sims,self.num_clusters)
-                epochs = np.arange(self.num_sims)
-            elif self.state == 4:
-                current_model = "Greedy Search 2k"
-                time_taken, average_guesses, win_rate,guesses = rl_greedy_1(self.num_sims)
-                epochs = np.arange(self.num_sims)
-            elif self.state == 5:
-                current_model = "Greedy Search 15k"
-                time_taken, average_guesses, win_rate,guesses = rl_greedy_2(self.num_sims)
-                epochs = np.arange(self.num_sims)
-
+            # the popup opens straight away with a progress bar, the graphs fill in as the games finish
+            current_model = self.state_dict[self.state]
+            num_sims = int(self.num_sims)
+            status_text = Label(text=f"Running {current_model}... 0 / {num_sims}", size_hint=(1,0.1))
+            progress_bar = ProgressBar(max=num_sims, size_hint=(1,0.1))
+            results_box = BoxLayout(orientation = "vertical")
+            popup_content.add_widget(status_text)
+            popup_content.add_widget(progress_bar)
+            popup_content.add_widget(results_box)
+            self.show_figures(results_box)
+
+            # a new run cancels the one before it
+            if self.cancel_event is not None:
+                self.cancel_event.set()
+            cancel_event = threading.Event()
+            self.cancel_event = cancel_event
+
+            run_params = (self.model_names[self.state], self.learning_rate, self.exploration_rate,
+                          self.shrinkage_factor, int(self.num_clusters), num_sims)
+            cached = self.result_cache.get(*run_params)
+
+            cancel_btn = Button(text='Cancel', disabled=cached is not None)
+            cancel_btn.bind(on_press=lambda btn: cancel_event.set())
+            button_row.add_widget(cancel_btn)
+
+            # finished games are queued by the executor thread and drawn a few times a second on the UI thread
+            finished_games = deque()
+            guesses = self.start_guesses_line(current_model, num_sims)
+
+            def refresh(dt):
+                if not finished_games:
+                    return
+                while finished_games:
+                    epoch, steps = finished_games.popleft()
+                    guesses[epoch] = steps
+                    progress_bar.value = epoch + 1
+                status_text.text = f"Running {current_model}... {int(progress_bar.value)} / {num_sims}"
+                self.update_guesses_line(current_model, guesses)
+
+            def finished(future):
+                refresh_event.cancel()
+                refresh(0)
+                cancel_btn.disabled = True
+                if cancel_event.is_set():
+                    status_text.text = f"{current_model} cancelled"
+                elif future.exception() is not None:
+                    status_text.text = f"{current_model} failed: {future.exception()}"
+                else:
+                    status_text.text = f"{current_model} done"
+                    self.show_results(current_model, self.result_cache.put(*run_params, future.result()))
+
+            if cached is not None:
+                status_text.text = f"{current_model} done (cached result)"
+                progress_bar.value = num_sims
+                self.show_results(current_model, cached)
             else:
-                pass
-
-            plt.figure(0) # First plot of epochs vs guesses
-            plt.bar(epochs,guesses,alpha=0.5, label=self.state_dict[self.state])
-            # plt.legend(bbox_to_anchor=(1.04,0.5), loc="upper left")
-            plt.legend(loc="upper right")
-            plt.title("Epochs vs Guesses")
-            plt.xlabel("Epochs")
-            plt.ylabel("Guesses")
-            popup_content.add_widget(FigureCanvasKivyAgg(plt.gcf()))
-
-            
-            # Used to create a radar chart for all other metrics
-            # https://towardsdatascience.com/how-to-make-stunning-radar-charts-with-python-implemented-in-matplotlib-and-plotly-91e21801d8ca
-            fig1 = plt.figure(1)
-            #define max scale range for each axes
-            max_time = time_taken + 1.0
-            if max_time > self.max_time:
-                self.max_time = max_time
-            category_range = [(0,self.max_time),(1,15),(0,100)]
-            radar = ComplexRadar(fig1,categories,category_range)
-
-            metrics = [time_taken,average_guesses,win_rate]
-            
-            # To plot multiple radar charts 
-            for key in self.currently_displayed.keys():
-                if key == current_model:
-                    self.currently_displayed[current_model] = metrics
-                    if self.currently_displayed[current_model] == []:
-                        self.currently_displayed[current_model] = metrics
-                        radar.plot(self.currently_displayed[current_model]) # this plot will add multiple plots to the graph
-                        radar.fill(metrics,alpha=0.2)
-                if self.currently_displayed[key] != []:
-                    radar.plot(self.currently_displayed[key])
-                    radar.fill(self.currently_displayed[key],alpha=0.2)
-                print(key,self.currently_displayed[key])
-            popup_content.add_widget(FigureCanvasKivyAgg(plt.gcf()))
-
-
-        close_btn = Button(text='Close me!', size_hint=(0.3,0.2))
+                refresh_event = Clock.schedule_interval(refresh, 0.1)
+                future = self.executor.submit(self.run_model, self.state, self.learning_rate, self.exploration_rate,
+                                              self.shrinkage_factor, int(self.num_clusters), num_sims,
+                                              lambda epoch, steps: finished_games.append((epoch, steps)),
+                                              cancel_event)
+                future.add_done_callback(lambda future: Clock.schedule_once(lambda dt: finished(future)))
+
+        close_btn = Button(text='Close me!', size_hint=(0.3,1))
         close_btn.pos_hint = {"center_x":0.5, "center_y":0.5}
-        popup_content.add_widget(close_btn)
+        button_row.add_widget(close_btn)
+        popup_content.add_widget(button_row)
 
         popup = Popup(title="Results", content=popup_content, auto_dismiss=False)
         close_btn.bind(on_press=popup.dismiss)
+        if self.state != 0:
+            # closing the popup also stops a run that is still going
+            close_btn.bind(on_press=lambda btn: cancel_event.set())
 
         # open the popup
         popup.open()
 
+    def build_figures(self):
+        # the two figures are made once, every run moves the artists of its model instead of adding new ones
+        self.guesses_figure, self.guesses_ax = plt.subplots()
+        self.guesses_ax.set_title("Epochs vs Guesses")
+        self.guesses_ax.set_xlabel("Epochs")
+        self.guesses_ax.set_ylabel("Guesses")
+        self.guesses_lines = {}
+        for key in self.currently_displayed.keys():
+            line, = self.guesses_ax.plot([], [], marker='o', markersize=3, alpha=0.5, label=key)
+            self.guesses_lines[key] = line
+        self.guesses_canvas = FigureCanvasKivyAgg(self.guesses_figure)
+
+        self.radar_figure = plt.figure()
+        self.radar = None
+        self.radar_artists = {}
+        self.radar_canvas = FigureCanvasKivyAgg(self.radar_figure)
+
+    def show_figures(self, results_box):
+        # moves the figure widgets from the last popup into the new one
+        for canvas in (self.guesses_canvas, self.radar_canvas):
+            if canvas.parent is not None:
+                canvas.parent.remove_widget(canvas)
+            results_box.add_widget(canvas)
+
+    def start_guesses_line(self, current_model, num_sims):
+        # clears the line of the model and returns the array its games are written into
+        guesses = np.full(num_sims, np.nan)
+        self.guesses_ax.legend(handles=[line for key, line in self.guesses_lines.items()
+                                        if key == current_model or not np.all(np.isnan(line.get_ydata()))],
+                               loc="upper right")
+        self.update_guesses_line(current_model, guesses)
+        return guesses
+
+    def update_guesses_line(self, current_model, guesses):
+        line = self.guesses_lines[current_model]
+        line.set_data(np.arange(len(guesses)), guesses)
+        longest = max(len(other.get_xdata()) for other in self.guesses_lines.values())
+        highest = max([np.nanmax(other.get_ydata()) for other in self.guesses_lines.values()
+                       if len(other.get_ydata()) and not np.all(np.isnan(other.get_ydata()))] + [6])
+        self.guesses_ax.set_xlim(-0.5, longest - 0.5)
+        self.guesses_ax.set_ylim(0, highest + 1)
+        self.guesses_canvas.draw_idle()
+
+    def show_results(self, current_model, results):
+        # fills in the graphs on the UI thread once the simulations are done
+        time_taken, average_guesses, win_rate, guesses = results
+        if guesses is not None:
+            self.update_guesses_line(current_model, guesses)
+        self.update_radar(current_model, [time_taken, average_guesses, win_rate])
+
+    def update_radar(self, current_model, metrics):
+        # Used to create a radar chart for all other metrics
+        # https://towardsdatascience.com/how-to-make-stunning-radar-charts-with-python-implemented-in-matplotlib-and-plotly-91e21801d8ca
+        categories = ['Time Taken', 'Average guesses', 'Win Rate']
+        self.currently_displayed[current_model] = metrics
+
+        # the time axis only grows, the radar is only rebuilt when it has to
+        max_time = metrics[0] + 1.0
+        if self.radar is None or max_time > self.max_time:
+            self.max_time = max(self.max_time, max_time)
+            category_range = [(0,self.max_time),(1,15),(0,100)]
+            self.radar_figure.clear()
+            self.radar = ComplexRadar(self.radar_figure,categories,category_range)
+            self.radar_artists = {}
+
+        # To plot multiple radar charts, one line and fill per model that has results
+        for key in self.currently_displayed.keys():
+            if self.currently_displayed[key] == []:
+                continue
+            if key in self.radar_artists:
+                line, polygon = self.radar_artists[key]
+                self.radar.set_data(line, polygon, self.currently_displayed[key])
+            else:
+                line, = self.radar.plot(self.currently_displayed[key])
+                polygon, = self.radar.fill(self.currently_displayed[key],alpha=0.2)
+                self.radar_artists[key] = (line, polygon)
+        self.radar_canvas.draw_idle()
+
+    def on_stop(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+        self.executor.shutdown(wait=False)
+
 if __name__ == "__main__":
     MainApp().run()
\ No newline at end of file
@@ -1,228 +1,70 @@
-import re
+import os
 import sys
-import random
+import queue
+import argparse
+import string
+import threading
 import pygame
 import numpy as np
 from datetime import date
-from leven import levenshtein
-from sklearn.cluster import AgglomerativeClustering
+from models import engine, wordle_daily_2k
 
 ##### PRESS ENTER TO PLAY THE GAME #####
+# python wordle_solver_pygame.py --autoplay plays the letters by itself, --headless replays the daily words of
+# --days days from --start without a window (e.g. --headless --start 2022-06-25 --days 100 --frames frames/)
 
-'''Our AI wordle algorithm similar to model/wordle_cluster_2k.py but modified slightly.'''
-
-words = []
-with open('models/goal_words.txt', 'r') as file:
-    for word in file:
-        words.append(word.strip('\n').upper())
-
-reference_goal = words.index('BEADY')
-date_diff = (date.today() - date(2022, 6, 25)).days
-CORRECT_WORD = words[reference_goal + date_diff].lower()
-
-
-class Clustering():
-    def __init__(self, number_of_clusters: int):
-        self.number_of_clusters = number_of_clusters
-
-    def get_dist_matrix(self, corpus: list):
-        n = len(corpus)
-        distance_matrix = np.zeros((n, n))
-        for i in range(n):
-            for j in range(i, n):
-                distance_matrix[i, j] = levenshtein(corpus[i], corpus[j])
-                distance_matrix[j, i] = distance_matrix[i, j]
-        return distance_matrix
-
-    def get_indexes_of_cluster(self, cluster_number: int, clusters: list):
-        indexes = []
-        for index, number in enumerate(clusters):
-            if cluster_number == number:
-                indexes.append(index)
-        return indexes
-
-    def get_chosen_word(self, indexes: list, corpus: list):
-        chosen_word_index = random.choice(indexes)
-        return corpus[chosen_word_index]
-
-    def get_clusters(self, corpus: list):
-        distance_matrix = self.get_dist_matrix(corpus)
-        clusters = AgglomerativeClustering(
-            n_clusters=self.number_of_clusters,
-            affinity='precomputed',
-            linkage='average').fit_predict(distance_matrix)
-        return clusters
-
-
-class Wordle():
-    def __init__(self, initial_word='CRANE'):
-        self.current_word = initial_word
-        self.current_state = None
-        self.goal_word = CORRECT_WORD.upper()
-        self.reached_goal = False
-
-    def get_state(self):
-        return self.current_state
-
-    def get_curr_word(self):
-        return self.current_word
-
-    def get_goal(self):
-        return self.goal_word
-
-    def make_action(self, action, state):
-        current_score = eval.get_score(self.current_word, self.goal_word)
-
-        self.current_word = action
-        self.current_state = state
-        new_score = eval.get_score(self.current_word, self.goal_word)
-        reward = eval.get_reward(current_score, new_score)
-
-        if self.current_word == self.goal_word:
-            return reward, True
-        return reward, False
-
-
-class eval():
-    def __init__(self):
-        pass
-
-    def get_score(word_1: str, word_2: str):
-        scoring = {'green': 0, 'yellow': 0, 'black': 0}
-        for i in range(5):
-            if word_1[i] == word_2[i]:
-                scoring['green'] += 1
-            elif word_1[i] in word_2:
-                scoring['yellow'] += 1
-            else:
-                scoring['black'] += 1
-        return scoring
-
-    def get_reward(new_scoring: dict, previous_score: dict):
-        reward = 0
-        reward += (new_scoring['green'] - previous_score['green'])*10
-        reward += (new_scoring['yellow'] - previous_score['yellow'])*5
-        reward -= (new_scoring['black'] - previous_score['black'])*1
-        return reward
-
-    def filter(filter_word: str, goal_word: str, corpus: list):
-        black_letters = []
-        yellow_letters = {}
-        green_letters = {}
-
-        for i in range(5):
-            if filter_word[i] != goal_word[i] and filter_word[i] not in goal_word:
-                black_letters.append(filter_word[i])
-            elif filter_word[i] == goal_word[i]:
-                green_letters[filter_word[i]] = i
-            elif filter_word[i] != goal_word[i] and filter_word[i] in goal_word:
-                yellow_letters[filter_word[i]] = i
-
-        if len(black_letters) != 0:
-            strings_to_remove = "[{}]".format("".join(black_letters))
-            corpus = [word for word in corpus if (
-                re.sub(strings_to_remove, '', word) == word or word == filter_word)]
-
-        if len(green_letters) != 0:
-            for key, value in green_letters.items():
-                corpus = [word for word in corpus if (
-                    word[value] == key or word == filter_word)]
-
-        if len(yellow_letters) != 0:
-            for key, value in yellow_letters.items():
-                corpus = [word for word in corpus if (
-                    word[value] != key or word == filter_word)]
-
-        if len(yellow_letters) != 0:
-            for yellow_letter in yellow_letters.keys():
-                corpus = [word for word in corpus if (
-                    yellow_letter in word or word == filter_word)]
-
-        if filter_word in corpus:
-            corpus.remove(filter_word)
-
-        return corpus
-
-
-def reinforcement_learning(learning_rate: int,
-                           exploration_rate: int,
-                           shrinkage_factor: int,
-                           number_of_cluster: int):
+parser = argparse.ArgumentParser(description="Wordle AI bot solver, press Enter to play the next letter.")
+parser.add_argument("--autoplay", action="store_true",
+                    help="play one letter per frame instead of waiting for Enter")
+parser.add_argument("--fps", type=int, default=60,
+                    help="frame rate of the main loop, 0 runs as fast as possible")
+parser.add_argument("--headless", action="store_true",
+                    help="run without a window on the SDL dummy video driver, implies --autoplay")
+parser.add_argument("--start", type=date.fromisoformat, default=date.today(),
+                    help="date of the first daily word to solve (YYYY-MM-DD), today by default")
+parser.add_argument("--days", type=int, default=1,
+                    help="number of consecutive daily words to replay when autoplaying")
+parser.add_argument("--frames", default=None,
+                    help="directory to save the final board of every replayed game to")
+args = parser.parse_args()
+args.autoplay = args.autoplay or args.headless
+if args.headless:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+if args.frames is not None:
+    os.makedirs(args.frames, exist_ok=True)
 
-    epsilon = exploration_rate
-    alpha = learning_rate
-    gamma = shrinkage_factor
+'''Our AI wordle algorithm similar to model/wordle_cluster_2k.py but modified slightly,
+played on today's word with the trained Q-table through the shared engine.'''
 
-    wordle = Wordle()
-    done = False
-    steps = 1
+words = list(engine.get_corpus('goal').words)
 
-    goal_word = wordle.get_goal()
-    if goal_word == 'CRANE':
-        return 1, ['CRANE']
 
-    curr_corpus = words.copy()
+def get_daily_word(day):
+    # The goal words are in daily order, see models/wordle_daily_2k.py.
+    return wordle_daily_2k.get_daily_word(day).lower()
 
-    # MODIFICATION here, to initialize the trained Q-table
-    q_table = np.load('models/Q_table.npy')
 
-    clust = Clustering(number_of_cluster)
-    distance_matrix = clust.get_dist_matrix(words)
-    cluster_results = clust.get_clusters(words)
+current_day = args.start
+CORRECT_WORD = get_daily_word(current_day)
 
-    wordle.current_state = cluster_results[curr_corpus.index(
-        wordle.get_curr_word())]
 
-    visited_words = []
-    while not done:
-        state = wordle.get_state()
-        word_to_filter_on = wordle.get_curr_word()
-        visited_words.append(word_to_filter_on)
+# The trained model: 9 clusters of the goal words, matching the 9 x 9 Q-table from run_simulation_pygame
+LEARNING_RATE = wordle_daily_2k.LEARNING_RATE
+EXPLORATION_RATE = wordle_daily_2k.EXPLORATION_RATE
+SHRINKAGE_FACTOR = wordle_daily_2k.SHRINKAGE_FACTOR
+NUMBER_OF_CLUSTER = wordle_daily_2k.NUMBER_OF_CLUSTER
 
-        prev_corpus = curr_corpus.copy()
-        curr_corpus = eval.filter(word_to_filter_on, goal_word, curr_corpus)
-
-        indices_removed = []
-        for i, word in enumerate(prev_corpus):
-            if word not in curr_corpus:
-                indices_removed.append(i)
-
-        distance_matrix = np.delete(distance_matrix, indices_removed, axis=0)
-        distance_matrix = np.delete(distance_matrix, indices_removed, axis=1)
-        cluster_results = np.delete(cluster_results, indices_removed, axis=0)
-
-        epsilon = epsilon / (steps ** 2)
-        if random.uniform(0, 1) < epsilon:
-            list_of_states_to_explore = list(set(cluster_results))
-            if len(list_of_states_to_explore) != 1:
-                if state in list_of_states_to_explore:
-                    list_of_states_to_explore.remove(state)
-            action_index = random.choice(list_of_states_to_explore)
-
-        else:
-            if np.all(q_table[state][i] == q_table[state][0] for i in range(len(curr_corpus))):
-                list_of_states_to_explore = list(set(cluster_results))
-                if len(list_of_states_to_explore) != 1:
-                    if state in list_of_states_to_explore:
-                        list_of_states_to_explore.remove(state)
-                action_index = random.choice(list_of_states_to_explore)
-            else:
-                action_index = np.argmax(q_table[state])
 
-        chosen_word = clust.get_chosen_word(clust.get_indexes_of_cluster(
-            action_index, cluster_results), curr_corpus)
-
-        reward, done = wordle.make_action(chosen_word, action_index)
-        new_state_max = np.max(q_table[action_index])
-
-        q_table[state, action_index] = (1 - alpha)*q_table[state, action_index] + alpha*(
-            reward + gamma*new_state_max - q_table[state, action_index])
-
-        steps = steps + 1
-        if steps >= len(words):
-            break
+def reinforcement_learning(learning_rate: int,
+                           exploration_rate: int,
+                           shrinkage_factor: int,
+                           number_of_cluster: int):
 
-    visited_words.append(goal_word)
+    # MODIFICATION here, to initialize the trained Q-table. The cluster labels and Q-table come prebuilt from
+    # the models/pygame_model/ bundle (loaded once), each run learns on its own copy of the Q-table like before,
+    # the same as the batch solve of models/wordle_daily_2k.py
+    steps, visited_words = wordle_daily_2k.solve(CORRECT_WORD.upper(), learning_rate, exploration_rate,
+                                                 shrinkage_factor, number_of_cluster)
     return visited_words
 
 
@@ -258,8 +100,16 @@ ALPHABET = ["QWERTYUIOP", "ASDFGHJKL", "ZXCVBNM"]
 GUESSED_LETTER_FONT = pygame.font.Font("GUI_files/assets/FreeSansBold.otf", 50)
 AVAILABLE_LETTER_FONT = pygame.font.Font(
     "GUI_files/assets/FreeSansBold.otf", 25)
+MESSAGE_FONT = pygame.font.Font("GUI_files/assets/FreeSansBold.otf", 40)
+
+# Letter glyphs are rendered once here and blitted from the cache on every draw.
+GUESSED_LETTER_GLYPHS = {(letter, color): GUESSED_LETTER_FONT.render(letter, True, color)
+                         for letter in string.ascii_uppercase for color in ("black", "white")}
+AVAILABLE_LETTER_GLYPHS = {letter: AVAILABLE_LETTER_FONT.render(letter, True, "white")
+                           for letter in string.ascii_uppercase}
 
-pygame.display.update()
+# Draw calls only mark the rectangles they touched, the main loop flips all of them at once at the end of the frame.
+dirty_rects = [SCREEN.get_rect()]
 
 LETTER_X_SPACING = 85
 LETTER_Y_SPACING = 12
@@ -278,22 +128,27 @@ current_letter_bg_x = 110
 
 # Indicators is a list storing all the Indicator object. An indicator is that button thing with all the letters you see.
 indicators = []
+indicators_by_letter = {}
 
-# List of words from our AI solver and their letters to display
-visited_words = reinforcement_learning(
-    learning_rate=0.1, exploration_rate=0.9, shrinkage_factor=0.9, number_of_cluster=10)
-
+# List of words from our AI solver and their letters to display, filled in once the background solver is done
+visited_words = []
 letters = []
-for word in visited_words:
-    word_letters = list(word)
-    for letter in word_letters:
-        letters.append(letter)
 
 # Keep track of the number of presses of `Enter` and the upperbound
-max_presses = len(letters)
+max_presses = 0
 presses = 0
 
+# The solver runs on a worker thread so the window keeps handling events while it works. Finished runs hand their
+# visited words back to the main loop through the queue, setting the event on quit drops a run still in progress.
+solver_results = queue.Queue()
+solver_cancelled = threading.Event()
+solving = False
+
 game_result = ""
+play_again_shown = False
+
+# Finished games of an autoplay replay as (date, word, number of guesses, W or L)
+replay_results = []
 
 
 class Letter:
@@ -307,8 +162,7 @@ class Letter:
         self.bg_rect = (bg_position[0], self.bg_y, LETTER_SIZE, LETTER_SIZE)
         self.text = text
         self.text_position = (self.bg_x+36, self.bg_position[1]+34)
-        self.text_surface = GUESSED_LETTER_FONT.render(
-            self.text, True, self.text_color)
+        self.text_surface = GUESSED_LETTER_GLYPHS[(self.text, self.text_color)]
         self.text_rect = self.text_surface.get_rect(center=self.text_position)
 
     def draw(self):
@@ -316,10 +170,9 @@ class Letter:
         pygame.draw.rect(SCREEN, self.bg_color, self.bg_rect)
         if self.bg_color == "white":
             pygame.draw.rect(SCREEN, FILLED_OUTLINE, self.bg_rect, 3)
-        self.text_surface = GUESSED_LETTER_FONT.render(
-            self.text, True, self.text_color)
+        self.text_surface = GUESSED_LETTER_GLYPHS[(self.text, self.text_color)]
         SCREEN.blit(self.text_surface, self.text_rect)
-        pygame.display.update()
+        dirty_rects.append(pygame.Rect(self.bg_rect))
 
 
 class Indicator:
@@ -330,16 +183,15 @@ class Indicator:
         self.text = letter
         self.rect = (self.x, self.y, 57, 75)
         self.bg_color = OUTLINE
+        self.text_surface = AVAILABLE_LETTER_GLYPHS[self.text]
+        self.text_rect = self.text_surface.get_rect(
+            center=(self.x+27, self.y+30))
 
     def draw(self):
         # Puts the indicator and its text on the screen at the desired position.
         pygame.draw.rect(SCREEN, self.bg_color, self.rect)
-        self.text_surface = AVAILABLE_LETTER_FONT.render(
-            self.text, True, "white")
-        self.text_rect = self.text_surface.get_rect(
-            center=(self.x+27, self.y+30))
         SCREEN.blit(self.text_surface, self.text_rect)
-        pygame.display.update()
+        dirty_rects.append(pygame.Rect(self.rect))
 
 # Drawing the indicators on the screen.
 
@@ -350,6 +202,7 @@ for i in range(3):
     for letter in ALPHABET[i]:
         new_indicator = Indicator(indicator_x, indicator_y, letter)
         indicators.append(new_indicator)
+        indicators_by_letter[letter] = new_indicator
         new_indicator.draw()
         indicator_x += 60
     indicator_y += 100
@@ -363,38 +216,37 @@ def check_guess(guess_to_check):
     # Goes through each letter and checks if it should be green, yellow, or grey.
     global current_guess, current_guess_string, guesses_count, current_letter_bg_x, game_result
     game_decided = False
+    touched_indicators = set()
     for i in range(5):
         lowercase_letter = guess_to_check[i].text.lower()
         if lowercase_letter in CORRECT_WORD:
             if lowercase_letter == CORRECT_WORD[i]:
                 guess_to_check[i].bg_color = GREEN
-                for indicator in indicators:
-                    if indicator.text == lowercase_letter.upper():
-                        indicator.bg_color = GREEN
-                        indicator.draw()
+                indicator = indicators_by_letter[lowercase_letter.upper()]
+                indicator.bg_color = GREEN
+                touched_indicators.add(indicator)
                 guess_to_check[i].text_color = "white"
                 if not game_decided:
                     game_result = "W"
             else:
                 guess_to_check[i].bg_color = YELLOW
-                for indicator in indicators:
-                    if indicator.text == lowercase_letter.upper():
-                        indicator.bg_color = YELLOW
-                        indicator.draw()
+                indicator = indicators_by_letter[lowercase_letter.upper()]
+                indicator.bg_color = YELLOW
+                touched_indicators.add(indicator)
                 guess_to_check[i].text_color = "white"
                 game_result = ""
                 game_decided = True
         else:
             guess_to_check[i].bg_color = GREY
-            for indicator in indicators:
-                if indicator.text == lowercase_letter.upper():
-                    indicator.bg_color = GREY
-                    indicator.draw()
+            indicator = indicators_by_letter[lowercase_letter.upper()]
+            indicator.bg_color = GREY
+            touched_indicators.add(indicator)
             guess_to_check[i].text_color = "white"
             game_result = ""
             game_decided = True
         guess_to_check[i].draw()
-        pygame.display.update()
+    for indicator in touched_indicators:
+        indicator.draw()
 
     guesses_count += 1
     current_guess = []
@@ -406,23 +258,62 @@ def check_guess(guess_to_check):
 
 
 def play_again():
-    # Puts the play again text on the screen.
-    pygame.draw.rect(SCREEN, "white", (10, 600, 1000, 600))
-    play_again_font = pygame.font.Font("GUI_files/assets/FreeSansBold.otf", 40)
-    play_again_text = play_again_font.render(
+    # Puts the play again text on the screen, once per finished game.
+    global play_again_shown
+    if play_again_shown:
+        return
+    play_again_shown = True
+    play_again_area = pygame.Rect(10, 600, 1000, 600)
+    pygame.draw.rect(SCREEN, "white", play_again_area)
+    play_again_text = MESSAGE_FONT.render(
         "Press ESC to rerun!", True, "black")
     play_again_rect = play_again_text.get_rect(center=(WIDTH/2, 700))
-    word_was_text = play_again_font.render(
+    word_was_text = MESSAGE_FONT.render(
         f"Today's wordle is {CORRECT_WORD.upper()}!", True, "black")
     word_was_rect = word_was_text.get_rect(center=(WIDTH/2, 650))
     SCREEN.blit(word_was_text, word_was_rect)
     SCREEN.blit(play_again_text, play_again_rect)
-    pygame.display.update()
+    dirty_rects.append(play_again_area.clip(SCREEN.get_rect()))
+
+
+def solve_in_background():
+    # Starts a solver run on a worker thread and shows the solving state until its words arrive.
+    global solving
+    solving = True
+
+    def work():
+        visited_words = reinforcement_learning(
+            LEARNING_RATE, EXPLORATION_RATE, SHRINKAGE_FACTOR, NUMBER_OF_CLUSTER)
+        if not solver_cancelled.is_set():
+            solver_results.put(visited_words)
+
+    threading.Thread(target=work, daemon=True).start()
+    solving_text = MESSAGE_FONT.render("Solving...", True, FILLED_OUTLINE)
+    solving_rect = solving_text.get_rect(center=(WIDTH/2, 300))
+    pygame.draw.rect(SCREEN, "white", solving_rect.inflate(20, 20))
+    SCREEN.blit(solving_text, solving_rect)
+    dirty_rects.append(solving_rect.inflate(20, 20))
+
+
+def receive_solution(solution):
+    # Takes the visited words of a finished solver run and lets `Enter` play them.
+    global solving, visited_words, letters, max_presses, presses
+    solving = False
+    visited_words = solution
+    letters = []
+    for word in visited_words:
+        word_letters = list(word)
+        for letter in word_letters:
+            letters.append(letter)
+    max_presses = len(letters)
+    presses = 0
+    SCREEN.blit(BACKGROUND, BACKGROUND_RECT)
+    dirty_rects.append(BACKGROUND_RECT)
 
 
 def reset():
     # Resets some global variables to their default states.
-    global guesses_count, CORRECT_WORD, guesses, current_guess, current_guess_string, game_result, presses, letters, max_presses, visited_words
+    global guesses_count, CORRECT_WORD, guesses, current_guess, current_guess_string, game_result, presses, letters, max_presses, play_again_shown
     SCREEN.fill("white")
     SCREEN.blit(BACKGROUND, BACKGROUND_RECT)
     guesses_count = 0
@@ -431,20 +322,50 @@ def reset():
     current_guess = []
     current_guess_string = ""
     game_result = ""
-    visited_words = reinforcement_learning(
-        learning_rate=0.001, exploration_rate=0.9, shrinkage_factor=0.9, number_of_cluster=9)
+    play_again_shown = False
     presses = 0
     letters = []
-    for word in visited_words:
-        word_letters = list(word)
-        for letter in word_letters:
-            letters.append(letter)
-    max_presses = len(letters)
+    max_presses = 0
 
-    pygame.display.update()
+    dirty_rects.append(SCREEN.get_rect())
     for indicator in indicators:
         indicator.bg_color = OUTLINE
         indicator.draw()
+    solve_in_background()
+
+
+def press_enter():
+    # Plays the next letter of the solver's words and checks the guess once it has 5 letters.
+    global key_pressed, presses
+    if presses < max_presses and len(current_guess_string) < 5:
+        key_pressed = str(letters.pop(0))
+        presses += 1
+        create_new_letter()
+    if len(current_guess_string) == 5 and current_guess_string.lower() in WORDS:
+        check_guess(current_guess)
+
+
+def finish_replay_game():
+    # Records the finished game of a replay and moves on to the next day, returns False once every day is played.
+    global current_day, CORRECT_WORD
+    replay_results.append((current_day, CORRECT_WORD.upper(), guesses_count, game_result))
+    if args.headless:
+        print(f"{current_day} {CORRECT_WORD.upper()}: {game_result} in {guesses_count}")
+    if args.frames is not None:
+        pygame.image.save(SCREEN, os.path.join(args.frames, f"{current_day}.png"))
+    if len(replay_results) == args.days:
+        return False
+    current_day = date.fromordinal(current_day.toordinal() + 1)
+    CORRECT_WORD = get_daily_word(current_day)
+    reset()
+    return True
+
+
+def print_replay_summary():
+    # Prints the win rate and average number of guesses over the replayed days.
+    wins = [guesses for _, _, guesses, result in replay_results if result == "W"]
+    print(f"Replayed {len(replay_results)} days from {args.start}: won {len(wins)}, "
+          f"average guesses {np.mean(wins) if wins else float('nan'):.3f}")
 
 
 def create_new_letter():
@@ -456,17 +377,31 @@ def create_new_letter():
     current_letter_bg_x += LETTER_X_SPACING
     guesses[guesses_count].append(new_letter)
     current_guess.append(new_letter)
-    for guess in guesses:
-        for letter in guess:
-            letter.draw()
+    new_letter.draw()
+
 
+clock = pygame.time.Clock()
+solve_in_background()
 
 while True:
+    if solving:
+        try:
+            receive_solution(solver_results.get_nowait())
+        except queue.Empty:
+            pass
     if game_result != "":
         play_again()
+        if args.autoplay and len(replay_results) < args.days and not finish_replay_game():
+            if args.headless:
+                print_replay_summary()
+                pygame.quit()
+                sys.exit()
+    elif args.autoplay and not solving:
+        press_enter()
     for event in pygame.event.get():
         # If quit, then exit the game e.g. alt-f4
         if event.type == pygame.QUIT:
+            solver_cancelled.set()
             pygame.quit()
             sys.exit()
         # If the user pressed a key
@@ -477,9 +412,8 @@ while True:
                     reset()
             # If user pressed enter button, check the guess
             elif event.key == pygame.K_RETURN:
-                if presses < max_presses and len(current_guess_string) < 5:
-                    key_pressed = str(letters.pop(0))
-                    presses += 1
-                    create_new_letter()
-                if len(current_guess_string) == 5 and current_guess_string.lower() in WORDS:
-                    check_guess(current_guess)
+                press_enter()
+    if dirty_rects:
+        pygame.display.update(dirty_rects)
+        dirty_rects.clear()
+    clock.tick(args.fps)